@@ -0,0 +1,166 @@
+"""
+Rendering of concept maps in parallel worker processes.
+"""
+
+# imports
+import matplotlib as mpl
+
+from .figures import FigurePool
+
+# the data shared by all maps of a batch, set once in each worker
+_shared = {}
+
+# the figures of the worker
+_figures = FigurePool(1)
+
+def init_worker(shared):
+    """
+    Store the data shared by all maps in the worker process.
+
+    Parameters
+    ----------
+    shared : dict
+        A dictionary with the background image and its extent, the names of
+        the taxa and their projected coordinates, the configuration, and the
+        options of the plots.
+
+    Notes
+    -----
+    When the workers are forked, the dictionary is inherited from the parent
+    process, and the background is not copied.
+    """
+    _shared.clear()
+    _shared.update(shared)
+
+def plot_concept_map(task):
+    """
+    Plot the distribution of two cogs of a concept on the map.
+
+    Parameters
+    ----------
+    task : tuple
+        The name of the output file (without extension) and the array of the
+        categories of the taxa: 1 (only first cog), 2 (only second cog), 3
+        (both cogs), and 4 (none of the cogs).
+
+    Returns
+    -------
+    filename : str
+        The name of the output file.
+    stats : dict
+        The statistics of the plot (see FigurePool.add).
+    """
+    filename,categories = task
+
+    conf = _shared['conf']
+    labels = _shared['labels']
+    tcolor = _shared['tcolor']
+    usetex = _shared['usetex']
+    extent = _shared['extent']
+
+    # usetex
+    mpl.rc('text',usetex=usetex)
+
+    # start to initialize the map
+    _figures.stats.clear()
+    with _figures.figure('concept_map') as fig:
+        figsp = fig.add_subplot(111)
+
+        # draw the background
+        figsp.imshow(_shared['image'],extent=extent,zorder=0)
+        figsp.set_xlim(extent[0],extent[1])
+        figsp.set_ylim(extent[2],extent[3])
+        figsp.set_xticks([])
+        figsp.set_yticks([])
+
+        # plot the points for the languages
+        cell_text = []
+        legend_check = []
+        for i,taxon in enumerate(_shared['taxa']):
+
+            # retrieve x and y from the map
+            x,y = _shared['x'][i],_shared['y'][i]
+            category = categories[i]
+
+            if category == 4:
+                marker = '*'
+            else:
+                marker = 's'
+
+            # check for legend
+            if labels[category] in legend_check:
+                # plot the marker
+                figsp.plot(
+                    x,
+                    y,
+                    marker,
+                    markersize = conf['markersize'],
+                    color = tcolor[category],
+                    )
+            else:
+                # plot the marker
+                figsp.plot(
+                    x,
+                    y,
+                    marker,
+                    markersize = conf['markersize'],
+                    color = tcolor[category],
+                    label=labels[category]
+                    )
+                legend_check.append(labels[category])
+
+            # add number to celltext
+            if usetex:
+                cell_text.append([str(i+1),taxon.replace('_',r'\_')])
+            else:
+                cell_text.append([str(i+1),taxon])
+
+            # plot the text
+            if tcolor[category] == 'black':
+                textcolor = 'white'
+            else:
+                textcolor='black'
+
+            figsp.text(
+                x,
+                y,
+                str(i+1),
+                size = str(int(conf['markersize'] / 2)),
+                label=taxon,
+                color = textcolor,
+                horizontalalignment='center',
+                verticalalignment='center',
+                )
+
+        this_table = figsp.table(
+                cellText = cell_text,
+                colWidths = conf['table.column.width'],
+                loc = conf['table.location'],
+                )
+
+        # adjust the table
+        for line in this_table._cells:
+            this_table._cells[line]._text._horizontalalignment = 'left'
+            this_table._cells[line]._text._fontproperties.set_weight('bold')
+            this_table._cells[line]._text.set_color(conf['table.text.color'])
+            this_table._cells[line].set_height(conf['table.cell.height'])
+            this_table._cells[line]._text._fontproperties.set_size(conf['table.text.size'])
+            this_table._cells[line].set_linewidth(0.0)
+            this_table._cells[line].set_color(conf['table.cell.color'])
+
+        this_table.set_zorder(100)
+
+        figsp.legend(
+                loc=conf['legend.location'],
+                numpoints=1,
+                prop={
+                    'size':conf['legend.size'],
+                    'weight':'bold'
+                    }
+                )
+
+        fig.subplots_adjust(left=0.05,right=0.95,top=0.95,bottom=0.05)
+
+        fig.savefig(filename+'.'+_shared['fileformat'])
+
+    return filename,_figures.stats['concept_map']
@@ -4,87 +4,146 @@ Compute the convex hull for a given set of points.
 Note
 ----
 
-This code has been taken from: http://www.scipy.org/Cookbook/Finding_Convex_Hull
+The hull is computed with Andrew's monotone chain algorithm in O(n log n).
+The interface follows the code taken from:
+http://www.scipy.org/Cookbook/Finding_Convex_Hull
 
 Author: Angus McMorland
 Date: 2007-08-16
 """
-import numpy as n, pylab as p, time
-
-def _angle_to_point(point, centre):
-    '''calculate angle in 2-D between points and x axis'''
-    delta = point - centre
-    res = n.arctan(delta[1] / delta[0])
-    if delta[0] < 0:
-        res += n.pi
-    return res
-
-def _draw_triangle(p1, p2, p3, **kwargs):
-    tmp = n.vstack((p1,p2,p3))
-    x,y = [x[0] for x in zip(tmp.transpose())]
-    p.fill(x,y, **kwargs)
+import numpy as n
 
 def area_of_triangle(p1, p2, p3):
     '''calculate area of any triangle given co-ordinates of the corners'''
     return n.linalg.norm(n.cross((p2 - p1), (p3 - p1)))/2.
 
+def _unique(pts):
+    '''remove repeated points from points sorted by x and y'''
+    keep = n.ones(len(pts), dtype='bool')
+    keep[1:] = (pts[1:] != pts[:-1]).any(1)
+    return pts[keep]
+
+def _discard_interior(pts):
+    '''remove the points which lie strictly inside the quadrilateral of the
+    extreme points, they cannot be part of the hull'''
+    corners = pts[[pts[:,0].argmin(), pts[:,1].argmin(), pts[:,0].argmax(),
+        pts[:,1].argmax()]]
+    inside = n.ones(len(pts), dtype='bool')
+    for i in range(4):
+        a, b = corners[i], corners[(i + 1) % 4]
+        inside &= (b[0] - a[0]) * (pts[:,1] - a[1]) - \
+                (b[1] - a[1]) * (pts[:,0] - a[0]) > 0
+    return pts[~inside]
+
+def _chain(pts):
+    '''return the hull of distinct points sorted by x and y as list,
+    counterclockwise, the points are added one at a time, and for collinear
+    points only the two endpoints are kept'''
+    if len(pts) < 3:
+        return pts
+
+    def turn(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower = []
+    for pt in pts:
+        while len(lower) > 1 and turn(lower[-2], lower[-1], pt) <= 0:
+            lower.pop()
+        lower.append(pt)
+    upper = []
+    for pt in reversed(pts):
+        while len(upper) > 1 and turn(upper[-2], upper[-1], pt) <= 0:
+            upper.pop()
+        upper.append(pt)
+
+    return lower[:-1] + upper[:-1]
+
+def _start_at_lowest_angle(hull, centre):
+    '''rotate the hull to start with the point of the lowest angle around
+    centre, angles are measured in (-pi/2, 3pi/2] as in the original code'''
+    delta = hull - centre
+    angles = n.arctan2(delta[:,1], delta[:,0])
+    angles[angles <= -n.pi / 2] += 2 * n.pi
+    return n.roll(hull, -angles.argmin(), axis=0)
 
 def convex_hull(points, graphic=True, smidgen=0.0075):
     '''Calculate subset of points that make a convex hull around points
 
-Recursively eliminates points that lie inside two neighbouring points until only convex hull is remaining.
+Discards the points inside the quadrilateral of the extreme points, sorts the
+remaining points by their coordinates and computes the lower and the upper
+part of the hull with a monotone chain. Points on the edges of the hull are
+not part of the hull, so if all points lie on one line, the hull consists of
+the two endpoints of the line. If there are fewer than 3 distinct points, the
+distinct points are returned, sorted by their coordinates.
 
 :Parameters:
     points : ndarray (2 x m)
         array of points for which to find hull
     graphic : bool
-        use pylab to show progress?
+        use pylab to show the points and the hull?
     smidgen : float
         offset for graphic number labels - useful values depend on your data range
 
 :Returns:
-    hull_points : ndarray (2 x n)
-        convex hull surrounding points
+    hull_points : ndarray (n x 2)
+        convex hull surrounding points, counterclockwise, starting with the
+        point of the lowest angle around the centre of the points
 '''
+    pts = n.asarray(points.T, dtype='float')
+    pts = _unique(pts[n.lexsort((pts[:,1], pts[:,0]))])
+    if len(pts) < 3:
+        return pts
+
+    pts = _discard_interior(pts)
+    hull = n.array(_chain(pts.tolist()), dtype='float')
+    hull = _start_at_lowest_angle(hull, points.mean(1))
+
     if graphic:
+        # pylab is only needed for the plot
+        import pylab as p
         p.clf()
         p.plot(points[0], points[1], 'ro')
-    n_pts = points.shape[1]
-    if n_pts < 3:
-        return points
-    centre = points.mean(1)
-    if graphic: p.plot((centre[0],),(centre[1],),'bo')
-    angles = n.apply_along_axis(_angle_to_point, 0, points, centre)
-    pts_ord = points[:,angles.argsort()]
-    if graphic:
-        for i in range(n_pts):
-            p.text(pts_ord[0,i] + smidgen, pts_ord[1,i] + smidgen, \
-                   '%d' % i)
-    pts = [x[0] for x in zip(pts_ord.transpose())]
-    prev_pts = len(pts) + 1
-    k = 0
-    while prev_pts > n_pts:
-        prev_pts = n_pts
-        n_pts = len(pts)
-        if graphic: p.gca().patches = []
-        i = -2
-        while i < (n_pts - 2):
-            Aij = area_of_triangle(centre, pts[i],     pts[(i + 1) % n_pts])
-            Ajk = area_of_triangle(centre, pts[(i + 1) % n_pts], \
-                                   pts[(i + 2) % n_pts])
-            Aik = area_of_triangle(centre, pts[i],     pts[(i + 2) % n_pts])
-            if graphic:
-                _draw_triangle(centre, pts[i], pts[(i + 1) % n_pts], \
-                               facecolor='blue', alpha = 0.2)
-                _draw_triangle(centre, pts[(i + 1) % n_pts], \
-                               pts[(i + 2) % n_pts], \
-                               facecolor='green', alpha = 0.2)
-                _draw_triangle(centre, pts[i], pts[(i + 2) % n_pts], \
-                               facecolor='red', alpha = 0.2)
-            if Aij + Ajk < Aik:
-                if graphic: p.plot((pts[i + 1][0],),(pts[i + 1][1],),'go')
-                del pts[i+1]
-            i += 1
-            n_pts = len(pts)
-        k += 1
-    return n.asarray(pts)
+        p.plot((points.mean(1)[0],), (points.mean(1)[1],), 'bo')
+        p.fill(hull[:,0], hull[:,1], facecolor='blue', alpha=0.2)
+        for i in range(len(hull)):
+            p.text(hull[i,0] + smidgen, hull[i,1] + smidgen, '%d' % i)
+
+    return hull
+
+def convex_hulls(point_sets):
+    '''Calculate the convex hulls of several sets of points at once
+
+All points are sorted in one pass, the hulls are then computed for each set
+with a monotone chain, which adds the points of the set one at a time.
+
+:Parameters:
+    point_sets : list
+        list of ndarrays (2 x m) of points, for example the coordinates of
+        the taxa of all clades of a tree
+
+:Returns:
+    hulls : list
+        the hulls of all sets, with the same conventions as convex_hull
+'''
+    if not point_sets:
+        return []
+
+    # sort all points by set, x, and y
+    sizes = n.array([pts.shape[1] for pts in point_sets])
+    pts = n.concatenate([pts.T for pts in point_sets]).astype('float')
+    groups = n.repeat(n.arange(len(point_sets)), sizes)
+    order = n.lexsort((pts[:,1], pts[:,0], groups))
+    sorted_pts = pts[order]
+    offsets = n.concatenate([[0], n.cumsum(sizes)])
+
+    hulls = []
+    for i, points in enumerate(point_sets):
+        pts = _unique(sorted_pts[offsets[i]:offsets[i+1]])
+        if len(pts) < 3:
+            hulls.append(pts)
+            continue
+        pts = _discard_interior(pts)
+        hull = n.array(_chain(pts.tolist()), dtype='float')
+        hulls.append(_start_at_lowest_angle(hull, points.mean(1)))
+
+    return hulls
@@ -0,0 +1,144 @@
+"""
+Reusable figures for the plots.
+"""
+
+# imports
+import sys
+import time
+from contextlib import contextmanager
+
+import matplotlib as mpl
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# resource is not available on all platforms
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def peak_memory():
+    """
+    Return the peak memory of the process in megabytes (None if unknown).
+
+    Notes
+    -----
+    The peak is the maximum over the lifetime of the process, the memory
+    used by a single plot can only be estimated from the increase of the peak
+    while it is rendered.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # the peak is given in bytes on mac os and in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return peak / 1024.0 ** 2
+    return peak / 1024.0
+
+class FigurePool(object):
+    """
+    A fixed number of Agg figures which are reused for all plots.
+
+    Parameters
+    ----------
+    size : int (default=2)
+        The maximal number of figures kept for reuse.
+    stats : {None, dict}
+        The dictionary in which the statistics of the plots are stored per
+        type of plot.
+
+    Notes
+    -----
+    The figures are not registered with pyplot, so they are never displayed
+    and do not count as open figures. A figure is taken from the pool with
+    the figure-method and always cleared when it is handed back, even if the
+    plot fails. For each type of plot, the number of plots, their total
+    render time in seconds, and the maximal increase of the peak memory of
+    the process in megabytes during one plot are stored in the statistics.
+    """
+    def __init__(
+            self,
+            size = 2,
+            stats = None
+            ):
+
+        self.size = size
+        self.stats = {} if stats is None else stats
+        self._free = []
+
+    def add(
+            self,
+            kind,
+            stats
+            ):
+        """
+        Add the statistics of plots to the statistics of their type.
+
+        Parameters
+        ----------
+        kind : str
+            The type of the plots.
+        stats : dict
+            The number of plots, their render time and the increase of the
+            peak memory, as stored by the figure-method.
+        """
+        if kind not in self.stats:
+            self.stats[kind] = dict(count=0,time=0.0,memory=None)
+        this = self.stats[kind]
+
+        this['count'] += stats['count']
+        this['time'] += stats['time']
+        if stats['memory'] is not None:
+            this['memory'] = max(this['memory'] or 0.0,stats['memory'])
+
+    @contextmanager
+    def figure(
+            self,
+            kind,
+            figsize = None,
+            facecolor = None
+            ):
+        """
+        Take a figure from the pool.
+
+        Parameters
+        ----------
+        kind : str
+            The type of the plot in the statistics.
+        figsize : {None, tuple}
+            The size of the figure in inches.
+        facecolor : {None, str}
+            The background color of the figure.
+        """
+        if self._free:
+            fig = self._free.pop()
+        else:
+            fig = Figure()
+            FigureCanvasAgg(fig)
+
+        if figsize:
+            fig.set_size_inches(figsize)
+        if facecolor:
+            fig.set_facecolor(facecolor)
+
+        start = time.time()
+        peak = peak_memory()
+        try:
+            yield fig
+            if peak is not None:
+                peak = peak_memory() - peak
+            self.add(kind,dict(count=1,time=time.time()-start,memory=peak))
+        finally:
+            # reset the figure and hand it back
+            fig.clf()
+            fig.set_size_inches(mpl.rcParams['figure.figsize'])
+            fig.set_facecolor(mpl.rcParams['figure.facecolor'])
+            if len(self._free) < self.size:
+                self._free.append(fig)
+
+    def close(self):
+        """
+        Release all figures of the pool.
+        """
+        self._free = []
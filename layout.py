@@ -0,0 +1,139 @@
+"""
+Automatic layout of the reference tree.
+"""
+
+# imports
+import numpy as np
+
+from .mln import _string,_float
+
+def tree_layout(
+        parents,
+        sizes,
+        depths,
+        mode = 'radial',
+        scale = 100.0
+        ):
+    """
+    Compute the coordinates of all nodes of a tree as a cladogram.
+
+    Parameters
+    ----------
+    parents : np.array
+        The index of the parent of each node (-1 for the root).
+    sizes : np.array
+        The number of nodes in the subtree of each node.
+    depths : np.array
+        The number of branches between each node and the root.
+    mode : str (default='radial')
+        Select between "radial" and "rectangular" layout.
+    scale : float (default=100.0)
+        The distance between neighboring tips and levels of the tree.
+
+    Returns
+    -------
+    x, y : np.array
+        The coordinates of the nodes.
+
+    Notes
+    -----
+    The nodes are expected in preorder, so that the tips of each subtree form
+    a contiguous block. The tips are placed next to each other in the order
+    of the tree, and each internal node is placed at the center of the first
+    and the last tip of its subtree. The level of a node is its depth, and
+    all tips are placed on the lowest level. In the radial layout, the
+    positions of the tips are distributed around the circle and the levels
+    are the radii. The layout is computed in linear time and does not depend
+    on anything but the tree.
+    """
+    sizes = np.asarray(sizes,dtype='int')
+    depths = np.asarray(depths,dtype='int')
+    tips = sizes == 1
+
+    # get the position of the first and the last tip of each subtree
+    counts = np.concatenate([[0],np.cumsum(tips)])
+    first = counts[np.arange(len(sizes))]
+    last = counts[np.arange(len(sizes)) + sizes] - 1
+    positions = (first + last) / 2.0
+
+    # place all tips on the lowest level
+    levels = np.where(tips,depths.max(),depths).astype('float')
+
+    if mode == 'rectangular':
+        return levels * scale,positions * scale
+
+    # distribute the tips around the circle, the root is the center
+    angles = 2 * np.pi * positions / counts[-1]
+    return levels * scale * np.cos(angles),levels * scale * np.sin(angles)
+
+def write_template(
+        filename,
+        nodes,
+        parents,
+        taxa,
+        x,
+        y
+        ):
+    """
+    Write the tree with the coordinates of its nodes to file in GML-format.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the output file.
+    nodes : list
+        The names of the nodes.
+    parents : np.array
+        The index of the parent of each node (-1 for the root).
+    taxa : list
+        The names of the nodes which are taxa.
+    x, y : np.array
+        The coordinates of the nodes.
+
+    Notes
+    -----
+    The nodes and edges are streamed to the file. The file can be read as
+    template of the reference tree with networkx and Cytoscape.
+    """
+    taxa = set(taxa)
+
+    f = open(filename,'w')
+    f.write('graph [\n')
+    for i,node in enumerate(nodes):
+        if node in taxa:
+            shape,w,h = 'rectangle',70.0,30.0
+        else:
+            shape,w,h = 'ellipse',30.0,30.0
+        f.write(
+                '  node [\n'
+                '    id {0}\n'
+                '    label {1}\n'
+                '    graphics [\n'
+                '      type {2}\n'
+                '      w {3}\n'
+                '      h {4}\n'
+                '      fill "#ffffff"\n'
+                '      x {5}\n'
+                '      y {6}\n'
+                '    ]\n'
+                '  ]\n'.format(
+                    i,
+                    _string(node),
+                    _string(shape),
+                    _float(w),
+                    _float(h),
+                    _float(x[i]),
+                    _float(y[i])
+                    )
+                )
+
+    for i,parent in enumerate(parents):
+        if parent >= 0:
+            f.write(
+                    '  edge [\n'
+                    '    source {0}\n'
+                    '    target {1}\n'
+                    '  ]\n'.format(parent,i)
+                    )
+    f.write(']\n')
+    f.close()
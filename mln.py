@@ -0,0 +1,492 @@
+"""
+Compact representation of minimal lateral networks.
+"""
+
+# imports
+import json
+
+import numpy as np
+import networkx as nx
+
+def _string(value):
+    """
+    Quote a string for GML, special characters are written as entities.
+    """
+    value = str(value).replace('&','&amp;').replace('"','&quot;')
+    value = ''.join(
+            [c if ord(c) < 128 else '&#{0};'.format(ord(c)) for c in value]
+            )
+    return '"'+value+'"'
+
+def _float(value):
+    """
+    Format a float for GML, the decimal point is required by the parsers.
+    """
+    value = repr(float(value))
+    if '.' not in value and 'e' in value:
+        value = value.replace('e','.0e')
+    return value
+
+def _write_attr(f,key,value,indent):
+    """
+    Write an attribute to a GML file, dictionaries are written as nested
+    lists and lists as repeated keys.
+    """
+    if isinstance(value,dict):
+        f.write('{0}{1} [\n'.format(indent,key))
+        for k,v in value.items():
+            _write_attr(f,k,v,indent+'  ')
+        f.write('{0}]\n'.format(indent))
+    elif isinstance(value,(list,tuple)):
+        for v in value:
+            _write_attr(f,key,v,indent)
+    elif isinstance(value,(bool,int,np.integer)):
+        f.write('{0}{1} {2}\n'.format(indent,key,int(value)))
+    elif isinstance(value,(float,np.floating)):
+        f.write('{0}{1} {2}\n'.format(indent,key,_float(value)))
+    else:
+        f.write('{0}{1} {2}\n'.format(indent,key,_string(value)))
+
+class MLN(object):
+    """
+    Minimal lateral network stored in arrays.
+
+    Parameters
+    ----------
+    nodes : list
+        The names of the nodes.
+    x, y : array-like
+        The coordinates of the nodes in the layout of the reference tree.
+    taxa : list
+        The names of the nodes which are taxa.
+    sources, targets : array-like
+        The indices of the nodes which are connected by the edges.
+    weights : array-like
+        The weights of the edges (0 for vertical edges).
+    horizontal : array-like
+        Whether an edge is horizontal (lateral) or vertical.
+    cogs : list
+        The list of cogs supporting each edge (empty for vertical edges).
+    fill : list
+        The colors of the edges in hex-notation.
+    width : array-like
+        The widths of the edges.
+    node_data : {None, list}
+        Further attributes of the nodes, such as those of the template, as
+        one dictionary per node.
+    edge_data : {None, list}
+        Further attributes of the edges as one dictionary per edge.
+
+    Notes
+    -----
+    The cogs of the edges are packed in CSR-format: the cogs of edge i are the
+    cogs with the indices cog_idx[cog_ptr[i]:cog_ptr[i+1]] in cog_names.
+    Conversion to networkx or GML is only carried out on export, the further
+    attributes of nodes and edges are only used there, the labels, the
+    coordinates and the styles of the network take precedence over them.
+    """
+    def __init__(
+            self,
+            nodes,
+            x,
+            y,
+            taxa,
+            sources,
+            targets,
+            weights,
+            horizontal,
+            cogs,
+            fill,
+            width,
+            node_data = None,
+            edge_data = None
+            ):
+
+        # store the nodes
+        self.nodes = list(nodes)
+        self.index = dict([(n,i) for i,n in enumerate(self.nodes)])
+        self.x = np.array(x,dtype='float')
+        self.y = np.array(y,dtype='float')
+        taxa = set(taxa)
+        self.is_taxon = np.array([n in taxa for n in self.nodes],dtype='bool')
+        if node_data is None:
+            node_data = [{} for n in self.nodes]
+        self.node_data = list(node_data)
+
+        # store the edges
+        self.sources = np.array(sources,dtype='int')
+        self.targets = np.array(targets,dtype='int')
+        self.weights = np.array(weights,dtype='int')
+        self.horizontal = np.array(horizontal,dtype='bool')
+        self.fill = list(fill)
+        self.width = np.array(width,dtype='float')
+        if edge_data is None:
+            edge_data = [{} for s in self.sources]
+        self.edge_data = list(edge_data)
+
+        self._pack_cogs(cogs)
+
+    def __len__(self):
+        return len(self.sources)
+
+    def _pack_cogs(self,cogs):
+        """
+        Pack the lists of cogs of all edges.
+        """
+        self.cog_names = []
+        cog2idx = {}
+        self.cog_ptr = np.zeros(len(cogs)+1,dtype='int')
+        cog_idx = []
+        for i,edge_cogs in enumerate(cogs):
+            for cog in edge_cogs:
+                if cog not in cog2idx:
+                    cog2idx[cog] = len(self.cog_names)
+                    self.cog_names += [cog]
+                cog_idx += [cog2idx[cog]]
+            self.cog_ptr[i+1] = len(cog_idx)
+        self.cog_idx = np.array(cog_idx,dtype='int')
+
+    def get_edge(self,nodeA,nodeB):
+        """
+        Return the index of the lateral edge between two nodes (or None).
+        """
+        if not hasattr(self,'pairs'):
+            self.make_index()
+
+        return self.pairs.get((self.index.get(nodeA),self.index.get(nodeB)))
+
+    def replace_edges(
+            self,
+            keep,
+            sources,
+            targets,
+            weights,
+            cogs
+            ):
+        """
+        Remove edges from the network and add new lateral edges.
+
+        Parameters
+        ----------
+        keep : array-like
+            Whether an edge of the network is kept.
+        sources, targets : array-like
+            The indices of the nodes which are connected by the new edges.
+        weights : array-like
+            The weights of the new edges.
+        cogs : list
+            The list of cogs supporting each new edge.
+
+        Notes
+        -----
+        The colors of the new edges are empty and their widths are 0, they
+        have to be set afterwards. The new edges have no further attributes.
+        The index of the lateral edges is created anew on the next query.
+        """
+        kept = np.where(keep)[0]
+        new = np.ones(len(sources),dtype='bool')
+
+        cogs = [self.get_cogs(i) for i in kept] + list(cogs)
+        self.sources = np.concatenate(
+                [self.sources[kept],np.array(sources,dtype='int')]
+                )
+        self.targets = np.concatenate(
+                [self.targets[kept],np.array(targets,dtype='int')]
+                )
+        self.weights = np.concatenate(
+                [self.weights[kept],np.array(weights,dtype='int')]
+                )
+        self.horizontal = np.concatenate([self.horizontal[kept],new])
+        self.fill = [self.fill[i] for i in kept] + ['' for i in new]
+        self.width = np.concatenate([self.width[kept],np.zeros(len(new))])
+        self.edge_data = [self.edge_data[i] for i in kept] + [{} for i in new]
+        self._pack_cogs(cogs)
+
+        # reset the index
+        for attr in ['ranking','pairs','node_ptr','node_edges']:
+            if hasattr(self,attr):
+                delattr(self,attr)
+
+    def get_cogs(self,edge):
+        """
+        Return the cogs supporting a given edge.
+        """
+        return [self.cog_names[i] for i in
+                self.cog_idx[self.cog_ptr[edge]:self.cog_ptr[edge+1]]]
+
+    def make_index(self):
+        """
+        Create the index for the queries of the lateral edges.
+
+        Notes
+        -----
+        The lateral edges are indexed by the pair of their nodes, and the
+        lateral edges of each node are packed in CSR-format, sorted by
+        decreasing weight: the edges of node i are
+        node_edges[node_ptr[i]:node_ptr[i+1]]. The ranking-attribute stores
+        all lateral edges sorted by decreasing weight.
+        """
+        edges = np.where(self.horizontal)[0]
+
+        # sort the edges by decreasing weight
+        self.ranking = edges[np.argsort(-self.weights[edges],kind='mergesort')]
+
+        # index the pairs of nodes
+        self.pairs = {}
+        for e in self.ranking:
+            a,b = self.sources[e],self.targets[e]
+            self.pairs[a,b] = e
+            self.pairs[b,a] = e
+
+        # pack the edges of the nodes, both endpoints of an edge are listed
+        nodes = np.concatenate(
+                [self.sources[self.ranking],self.targets[self.ranking]]
+                )
+        ranked = np.concatenate([self.ranking,self.ranking])
+        positions = np.concatenate([np.arange(len(self.ranking))]*2)
+        order = np.lexsort((positions,nodes))
+        self.node_ptr = np.zeros(len(self.nodes)+1,dtype='int')
+        self.node_ptr[1:] = np.cumsum(np.bincount(nodes,minlength=len(self.nodes)))
+        self.node_edges = ranked[order]
+
+    def _other(self,i,edge):
+        """
+        Return the name of the node linked to node i by an edge.
+        """
+        if self.sources[edge] == i:
+            return self.nodes[self.targets[edge]]
+        return self.nodes[self.sources[edge]]
+
+    def get_links(self,node):
+        """
+        Return the horizontal edges of a given node.
+
+        Returns
+        -------
+        links : list
+            The links as tuples of the name of the linked node and the index
+            of the edge, sorted by decreasing weight.
+        """
+        if not hasattr(self,'pairs'):
+            self.make_index()
+
+        i = self.index[node]
+        return [(self._other(i,e),e) for e in
+                self.node_edges[self.node_ptr[i]:self.node_ptr[i+1]]]
+
+    def get_pair(self,nodeA,nodeB):
+        """
+        Return weight and cogs of the lateral edge between two nodes.
+
+        Returns
+        -------
+        link : {None, tuple}
+            The weight and the list of cogs of the edge, or None, if the nodes
+            are not linked.
+        """
+        if not hasattr(self,'pairs'):
+            self.make_index()
+
+        pair = (self.index.get(nodeA),self.index.get(nodeB))
+        if pair not in self.pairs:
+            return None
+        e = self.pairs[pair]
+
+        return int(self.weights[e]),self.get_cogs(e)
+
+    def get_neighbors(self,node,k=None):
+        """
+        Return the nodes linked to a given node by lateral edges.
+
+        Parameters
+        ----------
+        node : str
+            The name of the node.
+        k : {None, int}
+            If set to an integer, only the k strongest links are returned.
+
+        Returns
+        -------
+        neighbors : list
+            The linked nodes as tuples of name, weight and list of cogs,
+            sorted by decreasing weight.
+        """
+        return [(n,int(self.weights[e]),self.get_cogs(e)) for n,e in
+                self.get_links(node)[:k]]
+
+    def get_top(self,k=10):
+        """
+        Return the k lateral edges with the highest weights.
+
+        Returns
+        -------
+        edges : list
+            The edges as tuples of the names of both nodes, weight and list of
+            cogs, sorted by decreasing weight.
+        """
+        if not hasattr(self,'pairs'):
+            self.make_index()
+
+        return [(
+            self.nodes[self.sources[e]],
+            self.nodes[self.targets[e]],
+            int(self.weights[e]),
+            self.get_cogs(e)
+            ) for e in self.ranking[:k]]
+
+    def save(self,filename):
+        """
+        Store the network in numpy's npz-format.
+        """
+        np.savez_compressed(
+                filename,
+                nodes = np.array(self.nodes,dtype='U'),
+                x = self.x,
+                y = self.y,
+                is_taxon = self.is_taxon,
+                sources = self.sources,
+                targets = self.targets,
+                weights = self.weights,
+                horizontal = self.horizontal,
+                fill = np.array(self.fill,dtype='U'),
+                width = self.width,
+                cog_names = np.array(self.cog_names,dtype='U'),
+                cog_ptr = self.cog_ptr,
+                cog_idx = self.cog_idx,
+                node_data = np.array(json.dumps(self.node_data),dtype='U'),
+                edge_data = np.array(json.dumps(self.edge_data),dtype='U')
+                )
+
+    def get_degree(self):
+        """
+        Return degree and weighted degree of all nodes for the lateral edges.
+        """
+        sources = self.sources[self.horizontal]
+        targets = self.targets[self.horizontal]
+        weights = self.weights[self.horizontal]
+        n = len(self.nodes)
+
+        degree = np.bincount(sources,minlength=n) + \
+                np.bincount(targets,minlength=n)
+        wdegree = np.bincount(sources,weights,minlength=n) + \
+                np.bincount(targets,weights,minlength=n)
+
+        return degree,np.array(wdegree,dtype='int')
+
+    def _get_node_attrs(self,i):
+        """
+        Return the attributes of a node for the export.
+        """
+        data = dict(self.node_data[i])
+        graphics = dict(data.get('graphics',{}))
+        if self.is_taxon[i]:
+            graphics.update(type='rectangle',w=80.0,h=20.0)
+        else:
+            graphics.update(type='ellipse',w=30.0,h=30.0)
+        graphics['fill'] = '#ff0000'
+        graphics['x'] = float(self.x[i])
+        graphics['y'] = float(self.y[i])
+
+        data['label'] = self.nodes[i]
+        data['graphics'] = graphics
+
+        return data
+
+    def _get_edge_attrs(self,i):
+        """
+        Return the attributes of an edge for the export.
+        """
+        data = dict(self.edge_data[i])
+        graphics = dict(data.get('graphics',{}))
+        if 'Line' in graphics:
+            del graphics['Line']
+        graphics['fill'] = self.fill[i]
+        graphics['width'] = float(self.width[i])
+
+        if self.horizontal[i]:
+            data['label'] = 'horizontal'
+            data['weight'] = int(self.weights[i])
+            data['cogs'] = ','.join(self.get_cogs(i))
+        else:
+            data['label'] = 'vertical'
+        data['graphics'] = graphics
+
+        return data
+
+    def to_networkx(self):
+        """
+        Convert the network to a networkx graph.
+        """
+        graph = nx.Graph()
+
+        for i,node in enumerate(self.nodes):
+            graph.add_node(node,**self._get_node_attrs(i))
+
+        for i in range(len(self)):
+            graph.add_edge(
+                    self.nodes[self.sources[i]],
+                    self.nodes[self.targets[i]],
+                    **self._get_edge_attrs(i)
+                    )
+
+        return graph
+
+    def write_gml(self,filename):
+        """
+        Write the network to file in GML-format.
+
+        Notes
+        -----
+        The nodes and edges are streamed from the arrays, without building a
+        networkx graph. The file contains the same attributes as the graph
+        returned by to_networkx and can be read by networkx and Cytoscape.
+        """
+        f = open(filename,'w')
+        f.write('graph [\n')
+        for i,node in enumerate(self.nodes):
+            f.write('  node [\n')
+            f.write('    id {0}\n'.format(i))
+            for key,value in self._get_node_attrs(i).items():
+                _write_attr(f,key,value,'    ')
+            f.write('  ]\n')
+
+        for i in range(len(self)):
+            f.write(
+                    '  edge [\n'
+                    '    source {0}\n'
+                    '    target {1}\n'.format(
+                        self.sources[i],
+                        self.targets[i]
+                        )
+                    )
+            for key,value in self._get_edge_attrs(i).items():
+                _write_attr(f,key,value,'    ')
+            f.write('  ]\n')
+        f.write(']\n')
+        f.close()
+
+def load_mln(filename):
+    """
+    Load a network which was stored with MLN.save.
+    """
+    data = np.load(filename)
+    cog_names = [str(c) for c in data['cog_names']]
+    cog_ptr,cog_idx = data['cog_ptr'],data['cog_idx']
+    nodes = [str(n) for n in data['nodes']]
+
+    return MLN(
+            nodes,
+            data['x'],
+            data['y'],
+            [n for n,t in zip(nodes,data['is_taxon']) if t],
+            data['sources'],
+            data['targets'],
+            data['weights'],
+            data['horizontal'],
+            [[cog_names[j] for j in cog_idx[cog_ptr[i]:cog_ptr[i+1]]] for i in
+                range(len(cog_ptr)-1)],
+            [str(f) for f in data['fill']],
+            data['width'],
+            json.loads(str(data['node_data'])),
+            json.loads(str(data['edge_data']))
+            )
@@ -1,50 +1,81 @@
 # imports
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib.patches as mplPatches
-import networkx as nx
 
 from .convex_hull import *
 
 # code for intersection taken from http://stackoverflow.com/questions/3252194/numpy-and-line-intersections
-def perp( a ) :
-    b = np.empty_like(a)
-    b[0] = -a[1]
-    b[1] = a[0]
-    return b
-
-# line segment a given by endpoints a1, a2
-# line segment b given by endpoints b1, b2
-# return 
-def seg_intersect(nA,nB) :
-    
-    a1 = np.array(nA[0],dtype='float')
-    a2 = np.array(nA[1],dtype='float')
-    b1 = np.array(nB[0],dtype='float')
-    b2 = np.array(nB[1],dtype='float')
-
-    da = a2-a1
-    db = b2-b1
-    dp = a1-b1
-    dap = perp(da)
-    denom = np.dot( dap, db)
-    num = np.dot( dap, dp )
-    try:
-        x,y = (num / denom)*db + b1
-    except:
-        return False
-    
-    # check whether the point is on both lines
-    x1 = sorted([a1[0],a2[0]])
-    x2 = sorted([b1[0],b2[0]])
-    y1 = sorted([a1[1],a2[1]])
-    y2 = sorted([b1[1],b2[1]])
-    
-    if x1[0] <= x <= x1[1] and x2[0] <= x <= x2[1]:
-        if y1[0] <= y <= y1[1] and y2[0] <= y <= y2[1]:
-            if [x,y] not in [k.tolist() for k in [a1,a2,b1,b2]]:
-                return True
-    return False
+def seg_intersect_batch(segmentsA,segmentsB):
+    """
+    Test all pairs of two arrays of line segments for intersection.
+
+    Parameters
+    ----------
+    segmentsA, segmentsB : array-like
+        The segments, given by their endpoints, as arrays of shape N x 2 x 2
+        and M x 2 x 2.
+
+    Returns
+    -------
+    intersections : np.array
+        A boolean array of shape N x M which is True if two segments
+        intersect.
+    points : np.array
+        The intersection points as an array of shape N x M x 2, with nan for
+        segments which do not intersect.
+
+    Notes
+    -----
+    Segments which only touch in one of their endpoints, including segments
+    which share an endpoint, do not count as intersecting, and neither do
+    parallel segments.
+    """
+    segmentsA = np.asarray(segmentsA,dtype='float')
+    segmentsB = np.asarray(segmentsB,dtype='float')
+
+    # get the endpoints, the segments of A along the first axis and the
+    # segments of B along the second one
+    a1 = segmentsA[:,None,0,:]
+    a2 = segmentsA[:,None,1,:]
+    b1 = segmentsB[None,:,0,:]
+    b2 = segmentsB[None,:,1,:]
+
+    # get the intersection of the lines through the segments
+    da = a2 - a1
+    db = b2 - b1
+    dp = a1 - b1
+    denom = -da[...,1] * db[...,0] + da[...,0] * db[...,1]
+    num = -da[...,1] * dp[...,0] + da[...,0] * dp[...,1]
+    with np.errstate(divide='ignore',invalid='ignore'):
+        points = (num / denom)[...,None] * db + b1
+
+    # check whether the point is on both segments
+    intersections = np.isfinite(points).all(-1)
+    for p1,p2 in [(a1,a2),(b1,b2)]:
+        with np.errstate(invalid='ignore'):
+            intersections &= (
+                    (np.minimum(p1,p2) <= points) &
+                    (points <= np.maximum(p1,p2))
+                    ).all(-1)
+
+    # exclude intersections in the endpoints and shared endpoints
+    for p1 in [a1,a2,b1,b2]:
+        intersections &= ~(points == p1).all(-1)
+    for p1 in [a1,a2]:
+        for p2 in [b1,b2]:
+            intersections &= ~(p1 == p2).all(-1)
+
+    points[~intersections] = np.nan
+
+    return intersections,points
+
+def seg_intersect(nA,nB):
+    """
+    Test whether two line segments given by their endpoints intersect.
+    """
+    intersections,points = seg_intersect_batch([nA],[nB])
+
+    return bool(intersections[0,0])
 
 def getConvexHull(
         nodes,
@@ -69,51 +100,23 @@ def getPolygonFromNodes(
         color='orange',
         alpha = 0.5,
         ):
+    """
+    Create a polygon without crossing edges which passes through all nodes.
+
+    Notes
+    -----
+    The nodes are sorted by their angle around the centroid and, for equal
+    angles, by their distance to the centroid. Connecting the nodes in this
+    order yields a simple polygon in O(n log n).
+    """
+    points = np.array(nodes,dtype='float')
+
+    # get angles and distances of the nodes around the centroid
+    delta = points - points.mean(0)
+    angles = np.arctan2(delta[:,1],delta[:,0])
+    distances = np.hypot(delta[:,0],delta[:,1])
     
-    # get all lines
-    lines = []
-    for i,nA in enumerate(nodes):
-        for j,nB in enumerate(nodes):
-            if i < j:
-                lines.append((nA,nB))
-    
-    # get all non-intersecting lines
-    ni_lines = []
-    for i,lineA in enumerate(lines):
-        this_line = lineA
-        for j,lineB in enumerate(lines):
-            if i != j:
-                if seg_intersect(lineA,lineB) and lineA != lineB:
-                    this_line = False
-        if this_line:
-            ni_lines.append(this_line)
-    
-    # make a graph of the lines
-    g = nx.Graph()
-    for a,b in ni_lines:
-        xA,yA = a
-        xB,yB = b
-        absX = abs(xA-xB)
-        absY = abs(yA-yB)
-        if absX == 0:
-            d = absY
-        elif absY == 0:
-            d = absX
-        else:
-            d = sqrt(absX**2+absY**2)
-        g.add_edge(a,b,weight=d)
-    
-    # sort the lines
-    start = g.nodes()[0]
-    paths = [start]
-    while True:
-        tmp = g.edge[start].items()
-        neighbors = [i[0] for i in tmp if i[0] not in paths]
-        if not neighbors:
-            break
-        distances = [i[1]['weight'] for i in tmp if i[0] not in paths]
-        this_neighbor = neighbors[distances.index(max(distances))]
-        start = this_neighbor
-        paths.append(this_neighbor)
+    # sort the nodes
+    paths = [nodes[i] for i in np.lexsort((distances,angles))]
 
     return mplPatches.Polygon(paths,closed=True,fill=True,color=color,alpha=alpha,lw=0)
@@ -0,0 +1,145 @@
+"""
+Compact storage of gain-loss scenarios.
+"""
+
+# imports
+from array import array
+from collections.abc import MutableMapping
+
+import numpy as np
+
+class Scenarios(MutableMapping):
+    """
+    Gain-loss scenarios of all cogs of a model stored in arrays.
+
+    Parameters
+    ----------
+    nodes : list
+        The names of the nodes of the reference tree, the position of a node
+        in the list is used as its id.
+    scenarios : {None, dict}
+        A dictionary with cogs as keys and tuples of the scenario (a list of
+        tuples of node name and event) and the number of origins as values.
+
+    Notes
+    -----
+    The scenarios are packed in CSR-format: the scenario stored in slot i
+    consists of the node ids nodes[offsets[i]:offsets[i+1]] with the events
+    (1 for gains, 0 for losses) at the same positions of the events-array.
+    Scenarios which are replaced or deleted leave an unused slot, the slots
+    are compacted when more than half of them are unused. Indexing with a cog
+    returns the scenario as a tuple of the list of (node, event) tuples and
+    the number of origins, as in a dictionary of scenarios.
+    """
+    def __init__(
+            self,
+            nodes,
+            scenarios = None
+            ):
+
+        self.nodes = nodes
+        self._node2idx = dict([(n,i) for i,n in enumerate(nodes)])
+
+        # the slot of each cog, the order of the cogs is the order of
+        # insertion, as in a dictionary
+        self._slots = {}
+
+        # the packed scenarios
+        self._offsets = array('l',[0])
+        self._nodes = array('i')
+        self._events = array('b')
+        self._noo = array('i')
+
+        if scenarios:
+            for cog,scenario in scenarios.items():
+                self[cog] = scenario
+
+    def __getitem__(self,cog):
+        i = self._slots[cog]
+        start,end = self._offsets[i],self._offsets[i+1]
+        gls = [(self.nodes[n],e) for n,e in zip(
+            self._nodes[start:end],
+            self._events[start:end]
+            )]
+
+        return gls,self._noo[i]
+
+    def __setitem__(self,cog,scenario):
+        gls,noo = scenario
+
+        # replaced scenarios are written to a new slot, the cog keeps its
+        # position in the order of the cogs
+        self._slots[cog] = len(self._noo)
+
+        self._nodes.extend([self._node2idx[n] for n,e in gls])
+        self._events.extend([e for n,e in gls])
+        self._offsets.append(len(self._nodes))
+        self._noo.append(noo)
+
+        if len(self._noo) > 2 * len(self._slots):
+            self.compact()
+
+    def __delitem__(self,cog):
+        del self._slots[cog]
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self,cog):
+        return cog in self._slots
+
+    def compact(self):
+        """
+        Remove the unused slots from the arrays.
+        """
+        cogs,offsets,nodes,events = self.get_arrays()
+        noo = self.get_noo()
+
+        self._slots = dict([(c,i) for i,c in enumerate(cogs)])
+        self._offsets = array('l',offsets.tolist())
+        self._nodes = array('i',nodes.tolist())
+        self._events = array('b',events.tolist())
+        self._noo = array('i',noo.tolist())
+
+    def get_noo(self):
+        """
+        Return the number of origins of all cogs as an array.
+        """
+        noo = np.array(self._noo,dtype='int')
+
+        return noo[list(self._slots.values())]
+
+    def get_arrays(self):
+        """
+        Return the scenarios of all cogs as arrays.
+
+        Returns
+        -------
+        cogs : list
+            The cogs in the order of the scenarios.
+        offsets : np.array
+            The start of the scenario of each cog in the arrays of nodes and
+            events, with the end of the last scenario appended.
+        nodes : np.array
+            The ids of the nodes.
+        events : np.array
+            The events (1 for gains, 0 for losses).
+        """
+        cogs = list(self._slots)
+        slots = np.array(list(self._slots.values()),dtype='int')
+        offsets = np.array(self._offsets,dtype='int')
+        all_nodes = np.array(self._nodes,dtype='int')
+        all_events = np.array(self._events,dtype='int')
+
+        # get the positions of the scenarios of the cogs in the arrays
+        starts = offsets[slots]
+        lengths = offsets[slots+1] - starts
+        new_offsets = np.zeros(len(cogs)+1,dtype='int')
+        new_offsets[1:] = np.cumsum(lengths)
+        positions = np.repeat(starts - new_offsets[:-1],lengths) + \
+                np.arange(new_offsets[-1])
+
+        return cogs,new_offsets,all_nodes[positions],all_events[positions]
@@ -0,0 +1,140 @@
+"""
+Geographic distances and their correlation with lateral links.
+"""
+
+# imports
+import multiprocessing
+
+import numpy as np
+
+# the mean radius of the earth in kilometers
+EARTH_RADIUS = 6371.0
+
+def haversine(latitudes,longitudes):
+    """
+    Compute the great-circle distances between all pairs of points.
+
+    Parameters
+    ----------
+    latitudes, longitudes : array-like
+        The coordinates of the points in degrees.
+
+    Returns
+    -------
+    distances : np.array
+        The matrix of the distances in kilometers.
+    """
+    lat = np.radians(np.asarray(latitudes,dtype='float'))
+    lon = np.radians(np.asarray(longitudes,dtype='float'))
+
+    # compute the haversine of the central angles for all pairs at once
+    dlat = lat[:,None] - lat[None,:]
+    dlon = lon[:,None] - lon[None,:]
+    h = np.sin(dlat / 2) ** 2 + \
+            np.cos(lat[:,None]) * np.cos(lat[None,:]) * np.sin(dlon / 2) ** 2
+
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(h,0,1)))
+
+def _standardize(values):
+    """
+    Center the values and scale them to unit norm along the last axis.
+    """
+    values = values - values.mean(-1)[...,None]
+    norm = np.sqrt((values ** 2).sum(-1))[...,None]
+    norm[norm == 0] = 1
+
+    return values / norm
+
+def _mantel_chunk(task):
+    """
+    Compute the correlations of a chunk of permutations of the first matrix.
+
+    Parameters
+    ----------
+    task : tuple
+        The first matrix, the standardized condensed second matrix, the
+        number of permutations, and the seed of the chunk.
+    """
+    x,y,permutations,seed = task
+
+    rng = np.random.RandomState(seed)
+    rows,cols = np.triu_indices(len(x),1)
+
+    # permute rows and columns of the first matrix for all permutations at
+    # once
+    perms = np.argsort(rng.rand(permutations,len(x)),axis=1)
+    permuted = x[perms[:,rows],perms[:,cols]]
+
+    return _standardize(permuted).dot(y)
+
+def mantel(
+        x,
+        y,
+        permutations = 999,
+        seed = None,
+        processes = 1,
+        chunksize = 100
+        ):
+    """
+    Compute the Mantel correlation of two symmetric matrices.
+
+    Parameters
+    ----------
+    x, y : np.array
+        The symmetric matrices, the diagonals are ignored.
+    permutations : int (default=999)
+        The number of permutations for the test of significance.
+    seed : {None, int}
+        The seed of the random number generator.
+    processes : {int, None} (default=1)
+        The number of worker processes which compute the permutations, None
+        uses all processors.
+    chunksize : int (default=100)
+        The number of permutations which are computed at once.
+
+    Returns
+    -------
+    r : float
+        The Pearson correlation of the upper triangles of both matrices.
+    p : float
+        The two-sided p-value of the permutation test.
+
+    Notes
+    -----
+    The permutations are split into chunks, each chunk is computed with its
+    own random number generator, the seeds of which are drawn from the
+    given seed. The result thus only depends on the seed and not on the
+    number of processes.
+    """
+    x = np.asarray(x,dtype='float')
+    y = np.asarray(y,dtype='float')
+    rows,cols = np.triu_indices(len(x),1)
+
+    # get the observed correlation
+    y_std = _standardize(y[rows,cols])
+    r = _standardize(x[rows,cols]).dot(y_std)
+
+    if not permutations:
+        return r,np.nan
+
+    # draw the seeds of the chunks
+    sizes = [chunksize] * (permutations // chunksize)
+    if permutations % chunksize:
+        sizes += [permutations % chunksize]
+    seeds = np.random.RandomState(seed).randint(2**31-1,size=len(sizes))
+    tasks = [(x,y_std,size,s) for size,s in zip(sizes,seeds)]
+
+    if processes == 1:
+        results = [_mantel_chunk(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_mantel_chunk,tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    permuted = np.concatenate(results)
+    p = (np.sum(np.abs(permuted) >= np.abs(r) - 1e-12) + 1.0) / (permutations + 1)
+
+    return r,p
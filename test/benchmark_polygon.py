@@ -0,0 +1,33 @@
+"""
+Benchmark the construction of polygons for clades of different size.
+"""
+
+# append library path to sys.path
+import sys
+sys.path.append('../../')
+
+import timeit
+import numpy as np
+
+# import the polygon functions
+from TreBor.polygon import getPolygonFromNodes,seg_intersect_batch
+
+# use random coordinates in the range of the test data
+rng = np.random.RandomState(1234)
+
+for size in [10,20,50,100,200,500]:
+    nodes = [tuple(x) for x in rng.uniform([20,100],[45,125],(size,2))]
+
+    # time the construction of the polygon
+    repeats = 10
+    time = timeit.timeit(lambda: getPolygonFromNodes(nodes),number=repeats)
+
+    # check that no two edges of the polygon cross each other, adjacent
+    # edges share an endpoint and do not count as crossing
+    path = getPolygonFromNodes(nodes).get_xy()[:-1]
+    edges = np.array([(path[i],path[(i+1) % len(path)]) for i in
+        range(len(path))])
+    intersections,points = seg_intersect_batch(edges,edges)
+    crossings = intersections.sum() // 2
+
+    print('{0}\t{1:.3f} ms\t{2}'.format(size,1000 * time / repeats,crossings))
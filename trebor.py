@@ -12,14 +12,19 @@ __date__="2013-02-25"
 
 # basic imports
 import os
+import copy
 import json
+import hashlib
+import multiprocessing
 import itertools
+from fractions import Fraction
 
 # thirdparty imports
 import numpy as np
 import networkx as nx
 import scipy.stats as sps
-import numpy.linalg as linalg
+import scipy.sparse as sparse
+from scipy.spatial import cKDTree
 
 # import error classes
 from lingpy.check.exceptions import *
@@ -29,6 +34,9 @@ from lingpy.check.messages import *
 try:
     import matplotlib as mpl
     import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    from .concept_maps import init_worker,plot_concept_map
+    from .figures import FigurePool
 except ImportError:
     ThirdPartyModuleError('matplotlib').warning()
 
@@ -40,10 +48,20 @@ except ImportError:
 
 # import polygon
 #try:
-from .polygon import getConvexHull
+from .convex_hull import convex_hulls
 #except:
 #    ThirdPartyModuleError('polygon').warning()
 
+# import the compact network and scenarios
+from .mln import MLN
+from .scenarios import Scenarios
+
+# import the geographic distances
+from .spatial import haversine,mantel
+
+# import the layout of the tree
+from .layout import tree_layout,write_template
+
 # lingpy imports
 from lingpy.thirdparty import cogent as cg
 from lingpy.convert.gml import *
@@ -154,6 +172,12 @@ class TreBor(object):
 
         if verbose: print("[i] Excluded singletons.")
 
+        # get the metadata of all cogs
+        self._cog_meta = {}
+        self._get_cog_meta()
+
+        if verbose: print("[i] Created the cog metadata.")
+
         # Load the tree, if it is not defined, assume that the treefile has the
         # same name as the dataset
         if not tree:
@@ -172,6 +196,9 @@ class TreBor(object):
 
         if verbose: print("[i] Loaded the tree.")
 
+        # create an index of the nodes in the tree
+        self._get_tree_index()
+
         # get the taxa
         self.taxa = self.wl.cols
 
@@ -180,6 +207,11 @@ class TreBor(object):
         # create a stats-dictionary
         self.stats = {}
 
+        # the pool of figures is created on demand, the statistics of the
+        # plots are stored per type of plot
+        self.plot_stats = {}
+        self._figures = None
+
         # create gls-dictionary
         self.gls = {}
 
@@ -188,7 +220,185 @@ class TreBor(object):
 
         # create dictionary for graph attributes
         self.graph = {}
-    
+
+        # create dictionary for the cogs gained and lost in each node
+        self.events = {}
+
+        # create dictionary for the co-origin counts of the models
+        self.coorigins = {}
+
+        # create dictionary for the minimum spanning trees and the lateral
+        # links of the models
+        self.lateral = {}
+
+        # create dictionary for the consensus of the lateral edges of several
+        # models
+        self.consensus = {}
+
+        # the template graph is loaded on demand
+        self.gml = None
+
+        # the convex hulls of the clades are computed on demand
+        self._hulls = (None,{})
+
+        # the backgrounds of the maps are rendered on demand
+        self._backgrounds = {}
+
+        # the geographic distances of the taxa are computed on demand
+        self._geo_distances = (None,None)
+
+    def _get_tree_index(self):
+        """
+        Create an index of all nodes in the reference tree.
+
+        Notes
+        -----
+        The nodes are stored in preorder in the nodes-attribute, so that all
+        nodes of a subtree form a contiguous block starting with the root of
+        the subtree. For each node, the index of the parent (-1 for the root)
+        and the number of nodes in its subtree are stored as arrays.
+        """
+        self.nodes = [node.Name for node in self.tree.preorder()]
+        self._node2idx = dict([(n,i) for i,n in enumerate(self.nodes)])
+
+        # get the parents of all nodes
+        self._parents = np.zeros(len(self.nodes),dtype='int')
+        for i,node in enumerate(self.tree.preorder()):
+            if node.Parent is None:
+                self._parents[i] = -1
+            else:
+                self._parents[i] = self._node2idx[node.Parent.Name]
+
+        # get the size of the subtrees, children follow their parents in
+        # preorder, so a reversed pass accumulates the sizes
+        self._sizes = np.ones(len(self.nodes),dtype='int')
+        for i in range(len(self.nodes)-1,0,-1):
+            self._sizes[self._parents[i]] += self._sizes[i]
+
+        # get the depth of all nodes
+        self._depths = np.zeros(len(self.nodes),dtype='int')
+        for i in range(1,len(self.nodes)):
+            self._depths[i] = self._depths[self._parents[i]] + 1
+
+        # the distances between the nodes are computed on demand
+        self._distances = None
+
+    def _get_tree_distances(self):
+        """
+        Return the number of branches connecting all pairs of nodes.
+
+        Notes
+        -----
+        The table is a matrix of nodes and nodes in the order of the tree
+        index, it is computed once and then stored. Each row is derived from
+        the row of the parent: all nodes are one branch further away from the
+        child than from its parent, except for the nodes in the subtree of
+        the child, which are one branch closer. Since subtrees form
+        contiguous blocks in preorder, each row is computed in a single
+        vectorized step.
+        """
+        if self._distances is not None:
+            return self._distances
+
+        # choose a small integer type for the table
+        if self._depths.max() < 2 ** 14:
+            dtype = 'int16'
+        else:
+            dtype = 'int32'
+
+        distances = np.zeros((len(self.nodes),len(self.nodes)),dtype=dtype)
+        distances[0] = self._depths
+        for i in range(1,len(self.nodes)):
+            distances[i] = distances[self._parents[i]] + 1
+            distances[i,i:i+self._sizes[i]] -= 2
+
+        self._distances = distances
+
+        return distances
+
+    def _get_cog_meta(
+            self,
+            cogs = None
+            ):
+        """
+        Store representative row, concept, proto and note of the given cogs.
+
+        Parameters
+        ----------
+        cogs : {None, list}
+            The cogs for which the metadata shall be (re-)computed. If set to
+            None, the metadata of all cogs is computed.
+
+        Notes
+        -----
+        The metadata is stored as a tuple (row, concept, proto, note) in the
+        _cog_meta-attribute, with proto and note set to None if the wordlist
+        does not contain the respective entry.
+        """
+        if cogs is None:
+            cogs = list(self.etd)
+
+        for cog in cogs:
+            
+            # the first row in which the cog occurs represents it
+            tmp = [x for x in self.etd[cog] if x != 0]
+            idx = tmp[0][0]
+
+            if 'proto' in self.wl.entries:
+                proto = self.wl[idx,'proto']
+            else:
+                proto = None
+            if 'note' in self.wl.entries:
+                note = self.wl[idx,'note']
+            else:
+                note = None
+
+            self._cog_meta[cog] = (idx,self.wl[idx,'concept'],proto,note)
+
+    def _get_glm(
+            self,
+            mode,
+            params
+            ):
+        """
+        Return the name of a gain-loss model for a given mode and parameter.
+        """
+        if mode in ['w','weighted']:
+            return 'w-{0[0]}-{0[1]}'.format(params)
+        elif mode in ['r','restriction']:
+            return 'r-{0}'.format(params)
+        elif mode in ['t','topdown']:
+            return 't-{0}'.format(params)
+
+        raise ValueError("[!] The mode {0} is not available".format(mode))
+
+    def _invalidate(
+            self,
+            glm
+            ):
+        """
+        Remove all products of the analysis which depend on a given model.
+
+        Notes
+        -----
+        The products of an analysis are the scenarios in the gls-attribute, the
+        ancestral distributions in the dists-attribute, the statistics
+        (including the comparison with the contemporary distribution) in the
+        stats-attribute, the index of gains and losses in the events-attribute,
+        the network in the graph-attribute, and the co-origin counts and
+        lateral links the network is computed from. The mixed model is derived
+        from all models it has been computed from, so it is removed as well, if
+        it depends on the given model.
+        """
+        for attr in [self.gls,self.dists,self.stats,self.graph,self.events,
+                self.coorigins,self.lateral]:
+            if glm in attr:
+                del attr[glm]
+
+        if glm != 'mixed' and 'mixed' in self.stats:
+            if glm in self.stats['mixed'].get('models',[]):
+                self._invalidate('mixed')
+
     def _get_GLS_top_down(
             self,
             pap,
@@ -592,6 +802,40 @@ class TreBor(object):
                 best_scenario = i
         return minimal_gains[best_scenario]
 
+    def _get_cog_GLS(
+            self,
+            cog,
+            mode,
+            ratio,
+            restriction
+            ):
+        """
+        Calculate the gain-loss scenario and the number of origins for a cog.
+        """
+        if mode == 'weighted':
+            gls = self._get_GLS(
+                    self.paps[cog],
+                    r = ratio,
+                    mode = 'w'
+                    )
+
+        if mode == 'restriction':
+            gls = self._get_GLS(
+                    self.paps[cog],
+                    r = restriction,
+                    mode = 'r'
+                    )
+
+        if mode == 'topdown':
+            gls = self._get_GLS_top_down(
+                    self.paps[cog],
+                    mode = restriction
+                    )
+
+        noo = sum([t[1] for t in gls])
+
+        return gls,noo
+
     def get_GLS(
             self,
             mode = 'weighted',
@@ -635,11 +879,12 @@ class TreBor(object):
 
         # create a named string for the mode
         if mode == 'weighted':
-            glm = 'w-{0[0]}-{0[1]}'.format(ratio)
-        elif mode == 'restriction':
-            glm = 'r-{0}'.format(restriction)
-        elif mode == 'topdown':
-            glm = 't-{0}'.format(restriction)
+            glm = self._get_glm(mode,ratio)
+        else:
+            glm = self._get_glm(mode,restriction)
+
+        # remove all products which were derived from older scenarios
+        self._invalidate(glm)
         
         # create statistics for this run
         self.stats[glm] = {}
@@ -649,38 +894,25 @@ class TreBor(object):
         self.stats[glm]['dataset'] = self.dataset
 
         # attribute stores all gls for each cog
-        self.gls[glm] = {}
+        self.gls[glm] = Scenarios(self.nodes)
 
         for cog in self.cogs:
             if verbose: print("[i] Calculating GLS for COG {0}...".format(cog),end="")
-            if mode == 'weighted':
-                gls = self._get_GLS(
-                        self.paps[cog],
-                        r = ratio,
-                        mode = 'w'
-                        )
-
-            if mode == 'restriction':
-                gls = self._get_GLS(
-                        self.paps[cog],
-                        r = restriction,
-                        mode = 'r'
-                        )
-
-            if mode == 'topdown':
-                gls = self._get_GLS_top_down(
-                        self.paps[cog],
-                        mode = restriction
-                        )
-
-            noo = sum([t[1] for t in gls])
             
-            self.gls[glm][cog] = (gls,noo)
+            self.gls[glm][cog] = self._get_cog_GLS(
+                    cog,
+                    mode,
+                    ratio,
+                    restriction
+                    )
 
 
             # attend scenario to gls
             if verbose: print(" done.")
         if verbose: print("[i] Successfully calculated Gain-Loss-Scenarios.")
+
+        # index the gains and losses of all nodes
+        self._get_events(glm)
  
         # write the results to file
         # make the folder for the data to store the stats
@@ -721,15 +953,16 @@ class TreBor(object):
             except:
                 pass
 
-            # load the graph
-            self.gml = nx.read_gml(self.dataset+'.gml')
+            # load the graph, gls2gml modifies the graph, so the stored
+            # template is copied once for all cogs
+            gTpl = copy.deepcopy(self._get_template(verbose=verbose))
 
             # store the graph
             for cog in self.cogs:
                 gls = self.gls[glm][cog][0]
                 g = gls2gml(
                         gls,
-                        self.gml,
+                        gTpl,
                         self.tree,
                         filename = folder+'/gml/{0}-{1}/{2}'.format(
                             self.dataset,
@@ -762,57 +995,58 @@ class TreBor(object):
                         edges += [(xA,xB,yA,yB)]
                     
                     #mpl.rc('text',usetex=keywords['usetex'])
-                    fig = plt.figure()
-                    figsp = fig.add_subplot(111)
-                    ax = plt.axes(frameon=False)
-                    plt.xticks([])
-                    plt.yticks([])
-                    
-                    plt.axis('equal')
-                    
-                    for xA,xB,yA,yB in edges:
-                    
-                        plt.plot(
-                                [xA,xB],
-                                [yA,yB],
-                                '-',
-                                color='black',
-                                linewidth=5
-                                )
-                        plt.plot(
-                                [xA,xB],
-                                [yA,yB],
-                                '-',
-                                color='0.2',
-                                linewidth=4
-                                )
-                    for x,y,f,o,l in nodes:
-                        if f == '#000000':
-                            c = '#ffffff'
-                        else:
-                            c = '#000000'
-                        if o == 1:
-                            size = 20
-                        else:
-                            size = 10
-                        if l.startswith('edge') or l.startswith('root'):
-                            plt.plot(x,y,'o',markersize=size,color=f)
-                        else:
-                            plt.text(
-                                    x,
-                                    y,
-                                    l,
-                                    horizontalalignment='center',
-                                    verticalalignment='center',
-                                    size=8,fontweight='bold',color=c,backgroundcolor=f)
-                    
-                    #plt.subplots_adjust(left=0.02,right=0.98,top=0.98,bottom=0.02)
-                    plt.savefig(folder+'/gml/{0}-{1}-figures/{2}.png'.format(
+                    plotname = folder+'/gml/{0}-{1}-figures/{2}'.format(
                         self.dataset,
                         glm,
                         cog
-                        ))
-                    plt.clf()
+                        )
+                    with self._get_figures().figure('gls') as fig:
+                        figsp = fig.add_subplot(111)
+                        ax = fig.add_subplot(111,frameon=False)
+                        ax.set_xticks([])
+                        ax.set_yticks([])
+                        
+                        ax.axis('equal')
+                        
+                        # draw the edges
+                        segments = [((xA,yA),(xB,yB)) for xA,xB,yA,yB in edges]
+                        ax.add_collection(
+                                LineCollection(
+                                    segments,
+                                    colors = 'black',
+                                    linewidths = 5
+                                    )
+                                )
+                        ax.add_collection(
+                                LineCollection(
+                                    segments,
+                                    colors = '0.2',
+                                    linewidths = 4
+                                    )
+                                )
+                        ax.autoscale_view()
+
+                        for x,y,f,o,l in nodes:
+                            if f == '#000000':
+                                c = '#ffffff'
+                            else:
+                                c = '#000000'
+                            if o == 1:
+                                size = 20
+                            else:
+                                size = 10
+                            if l.startswith('edge') or l.startswith('root'):
+                                ax.plot(x,y,'o',markersize=size,color=f)
+                            else:
+                                ax.text(
+                                        x,
+                                        y,
+                                        l,
+                                        horizontalalignment='center',
+                                        verticalalignment='center',
+                                        size=8,fontweight='bold',color=c,backgroundcolor=f)
+                        
+                        fig.savefig(plotname+'.png')
 
             # if tar is chosen, put it into a tarfile
             if tar:
@@ -827,35 +1061,14 @@ class TreBor(object):
 
 
         # store some statistics as attributes
-        self.stats[glm]['ano'] = sum(
-                [v[1] for v in self.gls[glm].values()]
-                ) / len(self.gls[glm])
-        self.stats[glm]['mno'] = max([v[1] for v in self.gls[glm].values()])
+        noo = self.gls[glm].get_noo()
+        self.stats[glm]['ano'] = noo.sum() / len(noo)
+        self.stats[glm]['mno'] = noo.max()
         self.stats[glm]['ratio'] = ratio 
         self.stats[glm]['restriction'] = restriction
 
         # store statistics and gain-loss-scenarios in textfiles
-        # create folder for gls-data
-        try:
-            os.mkdir(folder+'/gls')
-        except:
-            pass
-        
-        if verbose: print("[i] Writing GLS data to file... ",end="")
-        
-        # write gls-data to folder
-        f = open(folder+'/gls/{0}-{1}.gls'.format(self.dataset,glm),'w')
-        f.write('PAP\tGainLossScenario\tNumberOfOrigins\n')
-        for cog in sorted(self.gls[glm]):
-            gls,noo = self.gls[glm][cog]
-            f.write(
-                    "{0}\t".format(cog)+','.join(
-                        ["{0}:{1}".format(a,b) for a,b in gls]
-                        ) + '\t'+str(noo)+'\n'
-                    )
-        f.close()
-        if verbose: print("done.")
-
+        self._write_GLS(glm,verbose=verbose)
         
         # print out average number of origins
         if verbose: print("[i] Average Number of Origins: {0:.2f}".format(self.stats[glm]['ano']))
@@ -882,6 +1095,49 @@ class TreBor(object):
 
         return
 
+    def _write_GLS(
+            self,
+            glm,
+            verbose = False
+            ):
+        """
+        Write the gain-loss scenarios of a given model to file.
+        """
+        # create folder for gls-data
+        folder = self.dataset+'_trebor'
+        try:
+            os.mkdir(folder+'/gls')
+        except:
+            pass
+        
+        if verbose: print("[i] Writing GLS data to file... ",end="")
+        
+        # write gls-data to folder
+        f = open(folder+'/gls/{0}-{1}.gls'.format(self.dataset,glm),'w')
+        f.write('PAP\tGainLossScenario\tNumberOfOrigins\n')
+        for cog in sorted(self.gls[glm]):
+            gls,noo = self.gls[glm][cog]
+            f.write(
+                    "{0}\t".format(cog)+','.join(
+                        ["{0}:{1}".format(a,b) for a,b in gls]
+                        ) + '\t'+str(noo)+'\n'
+                    )
+        f.close()
+
+        # write the number of gains and losses in each node
+        if glm not in self.events:
+            self._get_events(glm)
+        f = open(folder+'/gls/{0}-{1}.nodes'.format(self.dataset,glm),'w')
+        f.write('NODE\tGAINS\tLOSSES\n')
+        for node in self.nodes:
+            f.write('{0}\t{1}\t{2}\n'.format(
+                node,
+                len(self.events[glm]['gains'][node]),
+                len(self.events[glm]['losses'][node])
+                ))
+        f.close()
+        if verbose: print("done.")
+
     def get_CVSD(
             self,
             verbose = False
@@ -909,94 +1165,156 @@ class TreBor(object):
         # store the stuff as an attribute
         self.dists['contemporary'] = [x for x,y in zip(forms,meanings)] # XXX
 
+        # comparisons with the ancestral distributions are outdated now
+        for glm in self.stats:
+            if 'vsd' in self.stats[glm]:
+                del self.stats[glm]['vsd']
+
         if verbose: print("[i] Calculated the distributions for contemporary taxa.")
         
         return 
 
-    def get_AVSD(
-            self,
-            glm,
-            verbose = False
-            ):
+    def _get_ancestral_nodes(self):
         """
-        Function retrieves all paps for ancestor languages in a given tree.
+        Return the root and all internal nodes, ordered by their number of tips.
         """
-        # define concepts for convenience
-        concepts = self.wl.concept # XXX do we need this? XXX
-        
-        # get all internal nodes, i.e. the nontips and also the root
-        nodes = ['root'] + sorted(
+        return ['root'] + sorted(
                 [node.Name for node in self.tree.nontips()],
                 key=lambda x: len(self.tree.getNodeMatchingName(x).tips()),
                 reverse = True
                 )
 
-        # retrieve scenarios
-        tmp = sorted([(a,b,c) for a,(b,c) in self.gls[glm].items()])
-        cog_list = [t[0] for t in tmp]
-        gls_list = [t[1] for t in tmp]
-        noo_list = [t[2] for t in tmp]
+    def _get_ancestral_states(
+            self,
+            gls,
+            nodes
+            ):
+        """
+        Return the presence (1) or absence (0) of a cog in the ancestral nodes.
+        """
+        # sort the gls
+        gls = sorted(
+                gls,
+                key = lambda x: len(self.tree.getNodeMatchingName(x[0]).tips()),
+                reverse = True
+                )
 
-        # create a list that stores the paps
-        paps = [[0 for i in range(len(nodes))] for j in range(len(cog_list))]
+        # retrieve the state of the root
+        if gls[0][1] == 1 and gls[0][0] == 'root':
+            state = 1
+        else:
+            state = 0
 
-        # iterate and assign values
-        for i,cog in enumerate(cog_list):
-            
-            # sort the respective gls
-            gls = sorted(
-                    gls_list[i],
-                    key = lambda x: len(self.tree.getNodeMatchingName(x[0]).tips()),
-                    reverse = True
-                    )
+        # assign the state of the root to all nodes
+        states = [state for node in nodes]
 
-            # retrieve the state of the root
-            if gls[0][1] == 1 and gls[0][0] == 'root':
-                state = 1
+        # iterate over the gls and assign the respective values to all
+        # children
+        for name,event in gls:
+            if event == 1:
+                this_state = 1
             else:
-                state = 0
+                this_state = 0
 
-            # assign the state of the root to all nodes
-            paps[i] = [state for node in nodes]
+            # get the subtree nodes
+            sub_tree_nodes = [node.Name for node in
+                    self.tree.getNodeMatchingName(name).nontips()]
 
-            # iterate over the gls and assign the respective values to all
-            # children
-            for name,event in gls:
-                if event == 1:
-                    this_state = 1
-                else:
-                    this_state = 0
-
-                # get the subtree nodes
-                sub_tree_nodes = [node.Name for node in
-                        self.tree.getNodeMatchingName(name).nontips()]
-
-                # assign this state to all subtree nodes
-                for node in sub_tree_nodes:
-                    paps[i][nodes.index(node)] = this_state
-
-        # get number of forms and number of meanings
-        # extract cogs instead of numbers, XXX this can actually be done in the
-        # step before, it's just for testing at the moment
-        for i,cog in enumerate(cog_list):
-            for j,t in enumerate(paps[i]):
-                if t == 1:
-                    paps[i][j] = cog
-                else:
-                    pass
+            # assign this state to all subtree nodes
+            for node in sub_tree_nodes:
+                states[nodes.index(node)] = this_state
+
+        return states
+
+    def _get_best_model(
+            self,
+            concept,
+            models,
+            nodes,
+            verbose = False
+            ):
+        """
+        Determine the model which explains the distribution of a concept best.
+
+        Returns
+        -------
+        best : tuple
+            The name of the best model, its p-value, the cogs of the concept,
+            and the ancestral distribution of the concept under the model.
+        """
+        # get paps
+        tmp = self.wl.get_dict(row=concept,entry=self._pap_string)
+
+        # add to list if value is missing
+        for taxon in self.taxa:
+            if taxon not in tmp:
+                tmp[taxon] = []
+
+        # calculate distribution for contemporary taxa
+        cvsd = [len([i for i in tmp[j] if i in self.cogs]) for j in self.taxa]
+
+        # calculate ancestral dists, get all paps first
+        pap_set = [i for i in set(
+                self.wl.get_list(
+                    row=concept,
+                    entry=self._pap_string,
+                    flat=True
+                    )
+                ) if i in self.cogs]
+
+        # get the scenarios
+        avsd_list = []
+        for idx,glm in enumerate(models):
+            avsd_list += [[0 for node in nodes]]
+            for pap in pap_set:
+                gls,noo = self.gls[glm][pap]
+                states = self._get_ancestral_states(gls,nodes)
+
+                # add the values to the avsd_list
+                avsd_list[-1] = [a+b for a,b in zip(avsd_list[-1],states)]
         
-        # get forms and meanings
-        forms = []
-        meanings = []
-        for i in range(len(paps[0])):
-            f = set([x[i] for x in paps if x[i] != 0])
-            m = set([x[i].split(':')[1] for x in paps if x[i] != 0])
-            forms += [len(f)]
-            meanings += [len(m)]
+        # check for correctness
+        if verbose: print(concept,avsd_list[-1],models[-1])
+        
+        # calculate best distribution
+        zp_vsd = []
+        cvsd_set = set(cvsd)
+        for avsd in avsd_list:
+            if len(cvsd_set) == 1 and set(avsd):
+                zp_vsd.append((0,1.0))
+            else:
+                vsd = sps.mannwhitneyu(
+                        cvsd,
+                        avsd
+                        )
+                zp_vsd.append(vsd)
+        
+        # extract p-values
+        p_vsd = [p for z,p in zp_vsd]
+        maxP = max(p_vsd)
+        maxIdx = p_vsd.index(maxP)
 
-        # store the number of forms as an attribute
-        self.dists[glm] = [x for x,y in zip(forms,meanings)] # XXX
+        return models[maxIdx],maxP,pap_set,avsd_list[maxIdx]
+
+    def get_AVSD(
+            self,
+            glm,
+            verbose = False
+            ):
+        """
+        Function retrieves all paps for ancestor languages in a given tree.
+        """
+        # get all internal nodes, i.e. the nontips and also the root
+        nodes = self._get_ancestral_nodes()
+
+        # count the cogs which are present in the ancestral nodes
+        forms = [0 for node in nodes]
+        for cog,(gls,noo) in sorted(self.gls[glm].items()):
+            states = self._get_ancestral_states(gls,nodes)
+            forms = [a+b for a,b in zip(forms,states)]
 
+        # store the number of forms as an attribute
+        self.dists[glm] = forms
 
         if verbose: print("[i] Calculated the distributions for ancestral taxa.")
 
@@ -1004,6 +1322,7 @@ class TreBor(object):
 
     def get_IVSD(
             self,
+            models = None,
             verbose = False,
             output_gml = False,
             output_plot = False,
@@ -1012,18 +1331,27 @@ class TreBor(object):
         """
         Calculate VSD on the basis of each item.
 
+        Parameters
+        ----------
+        models : {None, list} (default=None)
+            The models from which the best model for each item is chosen. If
+            set to c{None}, all models computed so far are taken.
+
         """
+        # get the models
+        if not models:
+            models = [m for m in self.gls if m != 'mixed']
+        models = sorted(models)
+
+        # remove the products of an older mixed model
+        self._invalidate('mixed')
 
         # define concepts and taxa for convenience
         concepts = self.wl.concept
         taxa = self.taxa
 
         # get all internal nodes, i.e. the nontips and also the root
-        nodes = ['root'] + sorted(
-                [node.Name for node in self.tree.nontips()],
-                key=lambda x: len(self.tree.getNodeMatchingName(x).tips()),
-                reverse = True
-                )
+        nodes = self._get_ancestral_nodes()
         
         # make dictionary that stores the best models for each cognate set
         best_models = {}
@@ -1035,93 +1363,12 @@ class TreBor(object):
         # iterate over concepts
         for concept in concepts:
 
-            # get paps
-            tmp = self.wl.get_dict(row=concept,entry=self._pap_string)
-
-            # add to list if value is missing
-            for taxon in taxa:
-                if taxon not in tmp:
-                    tmp[taxon] = []
-
-            # calculate distribution for contemporary taxa
-            cvsd = [len([i for i in tmp[j] if i in self.cogs]) for j in taxa]
-
-            # calculate ancestral dists, get all paps first
-            pap_set = [i for i in set(
-                    self.wl.get_list(
-                        row=concept,
-                        entry=self._pap_string,
-                        flat=True
-                        )
-                    ) if i in self.cogs]
-
-            # get the models
-            models = sorted(list(self.gls.keys()))
-
-            # get the scenarios
-            avsd_list = []
-            for idx,glm in enumerate(models):
-                avsd_list += [[0 for node in nodes]]
-                for pap in pap_set:
-                    gls,noo = self.gls[glm][pap]
-
-                    # sort the gls
-                    gls = sorted(
-                            gls,
-                            key = lambda x: len(self.tree.getNodeMatchingName(x[0]).tips()),
-                            reverse = True
-                            )
-
-                    # retrieve the state of the root
-                    if gls[0][1] == 1 and gls[0][0] == 'root':
-                        state = 1
-                    else:
-                        state = 0
-
-                    # assign the state of the root to all nodes in tmp
-                    tmp = [state for node in nodes]
-
-                    # iterate over the gls and assign the respective values to all
-                    # children
-                    for name,event in gls:
-                        if event == 1:
-                            this_state = 1
-                        else:
-                            this_state = 0
-
-                        # get the subtree nodes
-                        sub_tree_nodes = [node.Name for node in
-                                self.tree.getNodeMatchingName(name).nontips()]
-
-                        # assign this state to all subtree nodes
-                        for node in sub_tree_nodes:
-                            tmp[nodes.index(node)] = this_state
-
-                    # add the values to the avsd_list
-                    avsd_list[-1] = [a+b for a,b in zip(avsd_list[-1],tmp)]
-            
-            # check for correctness
-            if verbose: print(concept,avsd_list[-1],models[-1])
-            
-            # calculate best distribution
-            zp_vsd = []
-            cvsd_set = set(cvsd)
-            for avsd in avsd_list:
-                if len(cvsd_set) == 1 and set(avsd):
-                    zp_vsd.append((0,1.0))
-                else:
-                    vsd = sps.mannwhitneyu(
-                            cvsd,
-                            avsd
-                            )
-
-                zp_vsd.append(vsd)
-            
-            # extract p-values
-            p_vsd = [p for z,p in zp_vsd]
-            maxP = max(p_vsd)
-            maxIdx = p_vsd.index(maxP)
-            best_model = models[maxIdx]
+            best_model,maxP,pap_set,avsd = self._get_best_model(
+                    concept,
+                    models,
+                    nodes,
+                    verbose = verbose
+                    )
 
             for p in pap_set:
                 gls,noo = self.gls[best_model][p]
@@ -1129,7 +1376,7 @@ class TreBor(object):
                 scenarios[p] = (gls,noo)
 
             # add sum to general model
-            all_avsd = [a+b for a,b in zip(avsd_list[maxIdx],all_avsd)]
+            all_avsd = [a+b for a,b in zip(avsd,all_avsd)]
 
         
         self.best_models = best_models
@@ -1139,7 +1386,8 @@ class TreBor(object):
         self.dists['mixed'] = all_avsd
 
         # append to available models
-        self.gls['mixed'] = scenarios
+        self.gls['mixed'] = Scenarios(self.nodes,scenarios)
+        self._get_events('mixed')
 
         # write the results to file
         # make the folder for the data to store the stats
@@ -1180,15 +1428,16 @@ class TreBor(object):
             except:
                 pass
 
-            # load the graph
-            self.gml = nx.read_gml(self.dataset+'.gml')
+            # load the graph, gls2gml modifies the graph, so the stored
+            # template is copied once for all cogs
+            gTpl = copy.deepcopy(self._get_template(verbose=verbose))
 
             # store the graph
             for cog in self.cogs:
                 gls = self.gls["mixed"][cog][0]
                 g = gls2gml(
                         gls,
-                        self.gml,
+                        gTpl,
                         self.tree,
                         filename = folder+'/gml/{0}-{1}/{2}'.format(
                             self.dataset,
@@ -1221,63 +1470,64 @@ class TreBor(object):
                         edges += [(xA,xB,yA,yB)]
                     
                     #mpl.rc('text',usetex=keywords['usetex'])
-                    fig = plt.figure()
-                    figsp = fig.add_subplot(111)
-                    ax = plt.axes(frameon=False)
-                    plt.xticks([])
-                    plt.yticks([])
-                    
-                    plt.axis('equal')
-                    
-                    for xA,xB,yA,yB in edges:
-                    
-                        plt.plot(
-                                [xA,xB],
-                                [yA,yB],
-                                '-',
-                                color='black',
-                                linewidth=5
-                                )
-                        plt.plot(
-                                [xA,xB],
-                                [yA,yB],
-                                '-',
-                                color='0.2',
-                                linewidth=4
-                                )
-                    for x,y,f,o,l in nodes:
-                        if f == '#000000':
-                            c = '#ffffff'
-                        else:
-                            c = '#000000'
-                        if o == 1:
-                            size = 20
-                        else:
-                            size = 10
-                        if l.startswith('edge') or l.startswith('root'):
-                            plt.plot(x,y,'o',markersize=size,color=f)
-                        else:
-                            plt.text(
-                                    x,
-                                    y,
-                                    l,
-                                    horizontalalignment='center',
-                                    verticalalignment='center',
-                                    size=8,fontweight='bold',color=c,backgroundcolor=f)
-                    
-                    #plt.subplots_adjust(left=0.02,right=0.98,top=0.98,bottom=0.02)
-                    plt.savefig(folder+'/gml/{0}-{1}-figures/{2}.png'.format(
+                    plotname = folder+'/gml/{0}-{1}-figures/{2}'.format(
                         self.dataset,
                         "mixed",
                         cog
-                        ))
-                    plt.clf()
-
-            # if tar is chosen, put it into a tarfile
-            if tar:
-                os.system(
-                        'cd {0}_trebor/gml/ ; tar -pczf {0}-{1}.tar.gz {0}-{1}; cd ..; cd ..'.format(
-                            self.dataset,
+                        )
+                    with self._get_figures().figure('ivsd') as fig:
+                        figsp = fig.add_subplot(111)
+                        ax = fig.add_subplot(111,frameon=False)
+                        ax.set_xticks([])
+                        ax.set_yticks([])
+                        
+                        ax.axis('equal')
+                        
+                        # draw the edges
+                        segments = [((xA,yA),(xB,yB)) for xA,xB,yA,yB in edges]
+                        ax.add_collection(
+                                LineCollection(
+                                    segments,
+                                    colors = 'black',
+                                    linewidths = 5
+                                    )
+                                )
+                        ax.add_collection(
+                                LineCollection(
+                                    segments,
+                                    colors = '0.2',
+                                    linewidths = 4
+                                    )
+                                )
+                        ax.autoscale_view()
+
+                        for x,y,f,o,l in nodes:
+                            if f == '#000000':
+                                c = '#ffffff'
+                            else:
+                                c = '#000000'
+                            if o == 1:
+                                size = 20
+                            else:
+                                size = 10
+                            if l.startswith('edge') or l.startswith('root'):
+                                ax.plot(x,y,'o',markersize=size,color=f)
+                            else:
+                                ax.text(
+                                        x,
+                                        y,
+                                        l,
+                                        horizontalalignment='center',
+                                        verticalalignment='center',
+                                        size=8,fontweight='bold',color=c,backgroundcolor=f)
+                        
+                        fig.savefig(plotname+'.png')
+
+            # if tar is chosen, put it into a tarfile
+            if tar:
+                os.system(
+                        'cd {0}_trebor/gml/ ; tar -pczf {0}-{1}.tar.gz {0}-{1}; cd ..; cd ..'.format(
+                            self.dataset,
                             "mixed"
                             )
                         )
@@ -1288,281 +1538,844 @@ class TreBor(object):
 
         # store some statistics as attributes
         self.stats['mixed'] = {}
-        self.stats['mode'] = 'mixed'
-        self.stats['dataset'] = self.dataset
-        self.stats['mixed']['ano'] = sum(
-                [v[1] for v in self.gls['mixed'].values()]
-                ) / len(self.gls['mixed'])
-        self.stats['mixed']['mno'] = max([v[1] for v in self.gls['mixed'].values()])
+        self.stats['mixed']['mode'] = 'mixed'
+        self.stats['mixed']['dataset'] = self.dataset
+        self.stats['mixed']['models'] = models
+        noo = self.gls['mixed'].get_noo()
+        self.stats['mixed']['ano'] = noo.sum() / len(noo)
+        self.stats['mixed']['mno'] = noo.max()
 
         # store statistics and gain-loss-scenarios in textfiles
-        # create folder for gls-data
-        try:
-            os.mkdir(folder+'/gls')
-        except:
-            pass
-        
-        if verbose: print("[i] Writing GLS data to file... ",end="")
-        
-        # write gls-data to folder
-        f = open(folder+'/gls/{0}-{1}.gls'.format(self.dataset,"mixed"),'w')
-        f.write('PAP\tGainLossScenario\tNumberOfOrigins\n')
-        for cog in sorted(self.gls["mixed"]):
-            gls,noo = self.gls["mixed"][cog]
-            f.write(
-                    "{0}\t".format(cog)+','.join(
-                        ["{0}:{1}".format(a,b) for a,b in gls]
-                        ) + '\t'+str(noo)+'\n'
-                    )
-        f.close()
-        if verbose: print("done.")
+        self._write_GLS('mixed',verbose=verbose)
 
         return 
 
-    def get_MLN(
+    def _get_events(
+            self,
+            glm
+            ):
+        """
+        Create an index of the cogs gained and lost in the nodes of a model.
+
+        Notes
+        -----
+        The cogs are numbered in the order of the gls-attribute. The index is
+        stored in the events-attribute as a dictionary with the list of cogs
+        ("cogs"), their numbers ("cog2idx"), and a dictionary of nodes with
+        the sorted arrays of the numbers of the cogs gained ("gains") and lost
+        ("losses") in each node.
+        """
+        cogs,offsets,nodes,events = self.gls[glm].get_arrays()
+        rows = np.repeat(np.arange(len(cogs)),np.diff(offsets))
+
+        # sort the events by node, the numbers of the cogs stay sorted
+        order = np.lexsort((rows,nodes))
+        rows,nodes,events = rows[order],nodes[order],events[order]
+
+        gains,losses = {},{}
+        for index,mask in [(gains,events == 1),(losses,events != 1)]:
+            cogs_of_nodes = rows[mask]
+            ptr = np.zeros(len(self.nodes)+1,dtype='int')
+            ptr[1:] = np.cumsum(
+                    np.bincount(nodes[mask],minlength=len(self.nodes))
+                    )
+            for i,node in enumerate(self.nodes):
+                index[node] = cogs_of_nodes[ptr[i]:ptr[i+1]]
+
+        self.events[glm] = dict(
+                cogs = cogs,
+                cog2idx = dict([(c,i) for i,c in enumerate(cogs)]),
+                gains = gains,
+                losses = losses
+                )
+
+        return self.events[glm]
+
+    def _update_events(
             self,
             glm,
-            threshold = 1,
-            verbose = False,
-            colormap = mpl.cm.jet
+            previous
             ):
         """
-        Compute an evolutionary network for a given model.
+        Update the index of gains and losses after scenarios have changed.
+
+        Notes
+        -----
+        Cogs which do no longer occur keep their number, new cogs are
+        appended to the list of cogs.
         """
-        
-        # create the primary graph
-        gPrm = nx.Graph()
+        events = self.events[glm]
+        for cog,old in previous.items():
+            if old:
+                i = events['cog2idx'][cog]
+                for node,event in old[0]:
+                    key = 'gains' if event == 1 else 'losses'
+                    events[key][node] = events[key][node][
+                            events[key][node] != i
+                            ]
+
+            if cog in self.gls[glm]:
+                if cog not in events['cog2idx']:
+                    events['cog2idx'][cog] = len(events['cogs'])
+                    events['cogs'] += [cog]
+                i = events['cog2idx'][cog]
+                for node,event in self.gls[glm][cog][0]:
+                    key = 'gains' if event == 1 else 'losses'
+                    cogs = events[key][node]
+                    events[key][node] = np.insert(
+                            cogs,
+                            np.searchsorted(cogs,i),
+                            i
+                            )
 
-        # make alias for tree and taxa for convenience
-        taxa = self.taxa
-        tree = self.tree
+    def get_node_events(
+            self,
+            glm,
+            node
+            ):
+        """
+        Return the cogs gained and lost in a given node.
 
-        # create the template graph XXX add fallback procedure
-        try:
-            gTpl = nx.read_gml(self.dataset+'.gml')
-        except:
-            nwk2gml(self.dataset+'.tre',filename=self.dataset)
-            input("[i] Created GML file from tree. ")
-            gTpl = nx.read_gml(self.dataset+'.gml')
+        Parameters
+        ----------
+        glm : str
+            The name of the model.
+        node : str
+            The name of the node in the reference tree.
+
+        Returns
+        -------
+        gains,losses : list
+            The cogs gained and lost in the node.
+        """
+        if glm not in self.events:
+            self._get_events(glm)
+        events = self.events[glm]
+
+        return [[events['cogs'][i] for i in events[key][node]] for key in
+                ['gains','losses']]
+
+    def _get_coorigins(
+            self,
+            glm
+            ):
+        """
+        Return the number of cogs in which two nodes are both origins.
+
+        Notes
+        -----
+        The gains of all cogs of a model (taken from the events-attribute) are
+        encoded as a sparse incidence matrix of cogs and nodes, and
+        the counts are retrieved as the product of the transposed matrix
+        with itself. The result is a sparse matrix of nodes and nodes, the
+        diagonal of which gives the number of cogs originating in a node.
+        It is stored in the coorigins-attribute.
+        """
+        if glm in self.coorigins:
+            return self.coorigins[glm]
 
-        # make alias for the current gls for convenience
-        scenarios = self.gls[glm]
+        if glm not in self.events:
+            self._get_events(glm)
+        events = self.events[glm]
 
-        # create dictionary for inferred lateral events
-        ile = {}
+        rows,cols = [],[]
+        for node,cogs in events['gains'].items():
+            rows += list(cogs)
+            cols += [self._node2idx[node]] * len(cogs)
 
-        # create mst graph
-        gMST = nx.Graph()
+        incidence = sparse.csr_matrix(
+                (np.ones(len(rows),dtype='int'),(rows,cols)),
+                shape = (len(events['cogs']),len(self.nodes))
+                )
+        self.coorigins[glm] = incidence.T.dot(incidence).tocsr()
 
-        # create out graph
-        gOut = nx.Graph()
+        return self.coorigins[glm]
 
-        # load data for nodes into new graph
-        for node,data in gTpl.nodes(data=True):
-            if data['label'] in taxa:
-                data['graphics']['fill'] = '#ff0000'
-                data['graphics']['type'] = 'rectangle'
-                data['graphics']['w'] = 80.0
-                data['graphics']['h'] = 20.0
+    def _get_MST(
+            self,
+            oris,
+            weights,
+            distances
+            ):
+        """
+        Compute the minimum spanning tree for the origins of one cog.
+
+        Parameters
+        ----------
+        oris : list
+            The names of the origins.
+        weights, distances : array
+            The co-origin counts and the tree distances of all pairs of
+            origins, given in the order (0,1), (0,2), ..., (1,2), ...
+
+        Returns
+        -------
+        edges : list
+            The edges of the tree as pairs of node names.
+
+        Notes
+        -----
+        Identical weights are raised in small steps in the order of the tree
+        distance and the names of the nodes, and the weights are turned
+        into costs as int(1000 / weight). Pairs with identical costs are
+        processed in the order given above by Kruskal's algorithm, and the
+        edges are returned in the order in which a graph constructed from
+        the tree reports them, as it was done with networkx before.
+        """
+        if len(oris) < 2:
+            return []
+
+        pairs = [(i,j) for i in range(len(oris)) for j in range(i+1,len(oris))]
+        weights = [int(w) for w in weights]
+
+        # group the pairs by their weights
+        ties = {}
+        for k,w in enumerate(weights):
+            if w in ties:
+                ties[w] += [k]
             else:
-                data['graphics']['type'] = 'ellipse'
-                data['graphics']['w'] = 30.0
-                data['graphics']['h'] = 30.0
-                data['graphics']['fill'] = '#ff0000'
-            gPrm.add_node(data['label'],**data)
+                ties[w] = [k]
+
+        # change identical weights according to the tree distance
+        adjusted = [w for w in weights]
+        for w,klist in ties.items():
+            if len(klist) > 1:
+                scaler = 1 / len(klist)
+                minus = 1 - scaler
+                for k in sorted(
+                        klist,
+                        key = lambda x:(
+                            distances[x],
+                            oris[pairs[x][1]],
+                            oris[pairs[x][0]]
+                            ),
+                        reverse = True
+                        ):
+                    adjusted[k] += minus
+                    minus -= scaler
 
-        # load edge data into new graph
-        for nodeA,nodeB,data in gTpl.edges(data=True):
-            data['graphics']['width'] = 10.0
-            data['graphics']['fill'] = '#000000'
-            data['label'] = 'vertical'
-
-            gPrm.add_edge(
-                    gTpl.node[nodeA]['label'],
-                    gTpl.node[nodeB]['label'],
-                    **data
+        # change maximum weights to distance weights
+        costs = [int(1000 / w) for w in adjusted]
+
+        # calculate the MST with Kruskal's algorithm
+        roots = list(range(len(oris)))
+        edges = []
+        for k in sorted(range(len(pairs)),key=lambda x:costs[x]):
+            i,j = pairs[k]
+            while roots[i] != i:
+                i = roots[i]
+            while roots[j] != j:
+                j = roots[j]
+            if i != j:
+                roots[j] = i
+                edges += [pairs[k]]
+                if len(edges) == len(oris) - 1:
+                    break
+
+        # order the edges as they are stored in the adjacency of a graph
+        adjacency = {}
+        for i,j in edges:
+            for a,b in [(i,j),(j,i)]:
+                if a in adjacency:
+                    adjacency[a] += [b]
+                else:
+                    adjacency[a] = [b]
+        mst = []
+        seen = set()
+        for i in adjacency:
+            for j in adjacency[i]:
+                if j not in seen:
+                    mst += [(oris[i],oris[j])]
+            seen.add(i)
+
+        return mst
+
+    def _get_MSTs(
+            self,
+            glm,
+            cogs = None
+            ):
+        """
+        Compute the minimum spanning trees of the origins of all cogs.
+
+        Notes
+        -----
+        The co-origin counts and the tree distances of all pairs of origins
+        of all cogs are retrieved in one vectorized pass, the trees are then
+        computed for the small sets of origins in a tight loop.
+        """
+        if cogs is None:
+            cogs = list(self.gls[glm])
+
+        # get the origins and the pairs of origins of all cogs
+        origins = []
+        offsets = [0]
+        rows,cols = [],[]
+        for cog in cogs:
+            oris = [x[0] for x in self.gls[glm][cog][0] if x[1] == 1]
+            nodes = [self._node2idx[o] for o in oris]
+            for i in range(len(nodes)):
+                for j in range(i+1,len(nodes)):
+                    rows += [nodes[i]]
+                    cols += [nodes[j]]
+            origins += [oris]
+            offsets += [len(rows)]
+
+        # retrieve weights and distances of all pairs at once
+        if rows:
+            coorigins = self._get_coorigins(glm)
+            weights = np.asarray(coorigins[rows,cols]).ravel()
+            distances = self._get_tree_distances()[rows,cols]
+        else:
+            weights,distances = [],[]
+
+        msts = {}
+        for i,cog in enumerate(cogs):
+            msts[cog] = self._get_MST(
+                    origins[i],
+                    weights[offsets[i]:offsets[i+1]],
+                    distances[offsets[i]:offsets[i+1]]
                     )
 
-        # start to assign the edge weights
-        for cog,(gls,noo) in scenarios.items():
-            
-            # get the origins
-            oris = [x[0] for x in gls if x[1] == 1]
+        return msts
 
-            # connect origins by edges
-            for i,oriA in enumerate(oris):
-                for j,oriB in enumerate(oris):
-                    if i < j:
-                        try:
-                            gPrm.edge[oriA][oriB]['weight'] += 1
-                        except:
-                            gPrm.add_edge(
-                                    oriA,
-                                    oriB,
-                                    weight=1
-                                    )
+    def _add_links(
+            self,
+            links,
+            msts
+            ):
+        """
+        Add the edges of minimum spanning trees to the lateral links.
 
-        # verbose output
-        if verbose: print("[i] Calculated primary graph.")
-        
-        # verbose output
-        if verbose: print("[i] Inferring lateral edges...")
-            
-        # create MST graph
-        gMST = nx.Graph()
+        Notes
+        -----
+        The adjacency is stored in the same way as in a networkx graph, both
+        directions of a link share the same dictionary of weight and cogs.
+        """
+        for cog,edges in msts.items():
+            for nodeA,nodeB in edges:
+                if nodeA in links and nodeB in links[nodeA]:
+                    links[nodeA][nodeB]['weight'] += 1
+                    links[nodeA][nodeB]['cogs'] += [cog]
+                else:
+                    data = dict(weight=1,cogs=[cog])
+                    for a,b in [(nodeA,nodeB),(nodeB,nodeA)]:
+                        if a not in links:
+                            links[a] = {}
+                        links[a][b] = data
 
-        for cog,(gls,noo) in scenarios.items():
-            
-            ile[cog] = []
+    def _remove_links(
+            self,
+            links,
+            msts
+            ):
+        """
+        Remove the edges of minimum spanning trees from the lateral links.
+        """
+        for cog,edges in msts.items():
+            for nodeA,nodeB in edges:
+                data = links[nodeA][nodeB]
+                data['weight'] -= 1
+                data['cogs'].remove(cog)
+                if data['weight'] == 0:
+                    for a,b in [(nodeA,nodeB),(nodeB,nodeA)]:
+                        del links[a][b]
+                        if not links[a]:
+                            del links[a]
+
+    def _update_lateral(
+            self,
+            glm,
+            previous
+            ):
+        """
+        Update co-origin counts and lateral links after scenarios have changed.
 
-            # get the origins
-            oris = [x[0] for x in gls if x[1] == 1]
+        Parameters
+        ----------
+        glm : str
+            The name of the model.
+        previous : dict
+            The previous scenarios of all cogs which may have changed, with
+            None for cogs which did not occur before.
+
+        Notes
+        -----
+        The co-origin counts are patched with the origins of the changed
+        cogs, the index of gains and losses has to be updated before. Only
+        the minimum spanning trees of cogs which have both nodes of a pair
+        with changed counts among their origins are recomputed, and their
+        edges are replaced in the lateral links.
+
+        Returns
+        -------
+        pairs : {None, set}
+            The pairs of nodes whose lateral links have changed, or None, if
+            no lateral links are stored for the model.
+        """
+        # without co-origin counts, there is nothing to update
+        if glm not in self.coorigins:
+            if glm in self.lateral:
+                del self.lateral[glm]
+            return None
+
+        # get the changes in the co-origin counts
+        rows,cols,data = [],[],[]
+        changed = []
+        for cog,old in previous.items():
+            if old:
+                old = [x[0] for x in old[0] if x[1] == 1]
+            else:
+                old = []
+            if cog in self.gls[glm]:
+                new = [x[0] for x in self.gls[glm][cog][0] if x[1] == 1]
+            else:
+                new = []
+            if sorted(old) == sorted(new):
+                continue
+            changed += [cog]
+
+            for nodes,sign in [(old,-1),(new,1)]:
+                idxs = [self._node2idx[node] for node in nodes]
+                for a in idxs:
+                    for b in idxs:
+                        rows += [a]
+                        cols += [b]
+                        data += [sign]
+
+        delta = sparse.csr_matrix(
+                (np.array(data,dtype='int'),(rows,cols)),
+                shape = (len(self.nodes),len(self.nodes))
+                )
+        coorigins = (self.coorigins[glm] + delta).tocsr()
+        coorigins.eliminate_zeros()
+        self.coorigins[glm] = coorigins
+
+        if glm not in self.lateral:
+            return None
+
+        # get the cogs whose trees may have changed
+        affected = set(changed)
+        delta = delta.tocoo()
+        gains = self.events[glm]['gains']
+        for a,b,v in zip(delta.row,delta.col,delta.data):
+            if a < b and v != 0:
+                affected.update(
+                        [self.events[glm]['cogs'][i] for i in np.intersect1d(
+                            gains[self.nodes[a]],
+                            gains[self.nodes[b]],
+                            assume_unique = True
+                            )]
+                        )
 
-            # create a graph of weights
-            gWeights = nx.Graph()
-            
-            # iterate over nodes
-            for i,nodeA in enumerate(oris):
-                for j,nodeB in enumerate(oris):
-                    if i < j:
-                        w = gPrm.edge[nodeA][nodeB]['weight']
-                        gWeights.add_edge(
-                                nodeA,
-                                nodeB,
-                                weight=w
-                                )
-            
-            # if the graph is not empty
-            if gWeights:
+        # replace the trees of the affected cogs
+        msts,links = self.lateral[glm]
+        old_msts = dict([(cog,msts.pop(cog)) for cog in affected if cog in
+            msts])
+        self._remove_links(links,old_msts)
+        new_msts = self._get_MSTs(
+                glm,
+                [cog for cog in affected if cog in self.gls[glm]]
+                )
+        self._add_links(links,new_msts)
+        msts.update(new_msts)
 
-                # check for identical weights and change them according to
-                # tree-distance
-                tmp_weights = {}
-                for a,b,d in gWeights.edges(data=True):
-                    try:
-                        tmp_weights[int(d['weight'])] += [(a,b)]
-                    except:
-                        tmp_weights[int(d['weight'])] = [(a,b)]
-                
-                # check for identical weights and calculate the tree distance
-                for w in tmp_weights:
-                    elist = tmp_weights[w]
-                    
-                    # check whether there are more identical weights
-                    if len(elist) > 1:
-                        
-                        # if so, order all stuff according to branch length
-                        branches = []
-                        for a,b in elist:
-                            branch_distance = len(self.tree.getConnectingEdges(a,b))
-                            branches += [(a,b,branch_distance)]
-
-                        # now change the weights according to the order
-                        scaler = 1 / len(branches)
-                        minus = 1 - scaler
-                        branches = sorted(branches,key=lambda x:(x[2],x[1],x[0]),reverse=True)
-                        for a,b,d in branches:
-                            gWeights.edge[a][b]['weight'] += minus
-                            minus -= scaler
-                
-                # change maximum weights to distance weights
-                for a,b,d in sorted(gWeights.edges(data=True),key=lambda x:x[2]['weight']):
-                    w = d['weight']
-                    gWeights.edge[a][b]['weight'] = int(1000 / w)
-                
-                # calculate the MST
-                mst = nx.minimum_spanning_tree(gWeights,weight='weight')
-                
-                # assign the MST-weights to gMST
-                for nodeA,nodeB in mst.edges():
-                    try:
-                        gMST.edge[nodeA][nodeB]['weight'] += 1
-                        gMST.edge[nodeA][nodeB]['cogs'] += [cog]
-                    except:
-                        gMST.add_edge(
-                                nodeA,
-                                nodeB,
-                                weight=1,
-                                cogs=[cog]
-                                )
-                    ile[cog]+= [(nodeA,nodeB)]
+        # get the pairs of nodes whose links have changed
+        pairs = set()
+        for tree_edges in list(old_msts.values())+list(new_msts.values()):
+            pairs.update([tuple(sorted(edge)) for edge in tree_edges])
+
+        return pairs
+
+    def _update_MLN(
+            self,
+            glm,
+            pairs
+            ):
+        """
+        Patch the MLN of a model after lateral links have changed.
+
+        Parameters
+        ----------
+        glm : str
+            The name of the model.
+        pairs : set
+            The pairs of nodes whose lateral links have changed.
+
+        Notes
+        -----
+        Only the lateral edges between the given pairs are replaced in the
+        network. The colors and widths of the lateral edges are spread over
+        the range of all link weights, they are therefore computed anew. No
+        files are written, use TreBor.get_MLN to write the network.
+        """
+        graph = self.graph[glm]
+        msts,links = self.lateral[glm]
+        threshold = self.stats[glm]['threshold']
+        verticals = self._get_verticals()
+
+        # the network contains all nodes of the template
+        for node in set([node for pair in pairs for node in pair]):
+            if node not in graph.index:
+                raise ValueError(
+                        "[!] The node {0} is missing in the template "
+                        "{1}.gml.".format(node,self.dataset)
+                        )
+
+        # replace the edges of the changed pairs
+        keep = np.ones(len(graph),dtype='bool')
+        edges = []
+        for nodeA,nodeB in pairs:
+            e = graph.get_edge(nodeA,nodeB)
+            if e is not None:
+                keep[e] = False
+            data = links.get(nodeA,{}).get(nodeB)
+            if data and data['weight'] >= threshold and \
+                    (nodeA,nodeB) not in verticals:
+                edges += [(
+                    graph.index[nodeA],
+                    graph.index[nodeB],
+                    data['weight'],
+                    data['cogs']
+                    )]
+        if edges:
+            graph.replace_edges(keep,*zip(*edges))
+        else:
+            graph.replace_edges(keep,[],[],[],[])
+
+        # get the colors and the widths of the lateral edges
+        lateral = np.where(graph.horizontal)[0]
+        colors,widths = self._get_edge_styles(
+                [data['weight'] for nodeA in links for data in
+                    links[nodeA].values()],
+                graph.weights[lateral],
+                self.stats[glm]['colormap']
+                )
+        for i,color in zip(lateral,colors):
+            graph.fill[i] = color
+        graph.width[lateral] = widths
+        graph.make_index()
+
+    def make_template(
+            self,
+            mode = 'radial',
+            filename = None,
+            verbose = False
+            ):
+        """
+        Compute a layout of the reference tree and write it to file.
+
+        Parameters
+        ----------
+        mode : str (default='radial')
+            Select between "radial" and "rectangular" layout (see
+            layout.tree_layout).
+        filename : {None, str}
+            The name of the output file, defaults to the GML file of the
+            dataset, which is used as template for the plots.
+
+        Notes
+        -----
+        The layout is computed from the tree index and is always the same
+        for the same tree, so it can replace the manual layout in batch runs.
+        The template stored in the gml-attribute is reset.
+        """
+        if not filename:
+            filename = self.dataset+'.gml'
+
+        x,y = tree_layout(
+                self._parents,
+                self._sizes,
+                self._depths,
+                mode = mode
+                )
+        write_template(filename,self.nodes,self._parents,self.taxa,x,y)
+        self.gml = None
+
+        if verbose: print("[i] Wrote the layout of the tree to {0}.".format(filename))
+
+    def _get_figures(self):
+        """
+        Return the pool of figures for the plots.
+
+        Notes
+        -----
+        The pool is only created with the first plot, so that matplotlib is
+        not required for analyses without plots.
+        """
+        if self._figures is None:
+            self._figures = FigurePool(stats=self.plot_stats)
+
+        return self._figures
+
+    def _get_template(
+            self,
+            verbose = False
+            ):
+        """
+        Load the graph of the reference tree with the coordinates of its nodes.
+
+        Notes
+        -----
+        The template is parsed only once and then stored in the gml-attribute.
+        It is shared by all callers, functions which modify the graph have to
+        work on a copy. If the GML file of the dataset is missing, it is
+        created with the automatic layout of the tree (see
+        TreBor.make_template).
+        """
+        if self.gml is not None:
+            return self.gml
+
+        # create the template graph
+        if not os.path.exists(self.dataset+'.gml'):
+            self.make_template(verbose=verbose)
+        self.gml = nx.read_gml(self.dataset+'.gml')
+
+        return self.gml
+
+    def _get_verticals(
+            self,
+            verbose = False
+            ):
+        """
+        Return the pairs of nodes connected by vertical edges in the template.
+        """
+        gTpl = self._get_template(verbose=verbose)
+        verticals = set()
+        for nodeA,nodeB in gTpl.edges():
+            nodeA = gTpl.node[nodeA]['label']
+            nodeB = gTpl.node[nodeB]['label']
+            verticals.add((nodeA,nodeB))
+            verticals.add((nodeB,nodeA))
+
+        return verticals
+
+    def _get_lateral_edges(
+            self,
+            glm
+            ):
+        """
+        Compute the lateral edges of the MLN of a given model.
+
+        Notes
+        -----
+        The minimum spanning trees and the lateral links are stored in the
+        lateral-attribute, so that they can be updated in place if the
+        scenarios of some cogs change.
+
+        Returns
+        -------
+        edges : list
+            The lateral edges as triples of two node names and a dictionary
+            with their weight and the list of cogs supporting them.
+        ile : dict
+            The inferred lateral events of all cogs.
+        """
+        # compute the minimum spanning trees of the origins of all cogs and
+        # the lateral links they support
+        if glm not in self.lateral:
+            msts = self._get_MSTs(glm)
+            links = {}
+            self._add_links(links,msts)
+            self.lateral[glm] = (msts,links)
+        msts,links = self.lateral[glm]
+
+        # get the inferred lateral events in the order of the scenarios
+        ile = dict([(cog,msts[cog]) for cog in self.gls[glm]])
+
+        # get the edges in the order of the adjacency
+        mst_edges = []
+        seen = set()
+        for nodeA in links:
+            for nodeB,data in links[nodeA].items():
+                if nodeB not in seen:
+                    mst_edges += [(nodeA,nodeB,data)]
+            seen.add(nodeA)
+
+        return mst_edges,ile
+
+    def _get_edge_styles(
+            self,
+            link_weights,
+            weights,
+            colormap = mpl.cm.jet
+            ):
+        """
+        Return the colors and the widths of lateral edges.
+
+        Parameters
+        ----------
+        link_weights : list
+            The weights of all lateral links of the model, the colors are
+            spread over the distinct weights, and the widths are scaled by
+            the maximal weight.
+        weights : list
+            The weights of the edges.
+        """
+        levels = sorted(set(link_weights))
+        if not levels:
+            return [],[]
+        cfunc = np.array(np.linspace(0,256,len(levels)),dtype='int')
+        scale = 20.0 / levels[-1]
+
+        idx = np.searchsorted(levels,weights)
+        colors = [mpl.colors.rgb2hex(colormap(c)) for c in cfunc[idx]]
+
+        return colors,[w * scale for w in weights]
+
+    def _get_MLN_graph(
+            self,
+            mst_edges,
+            threshold = 1,
+            colormap = mpl.cm.jet,
+            verbose = False
+            ):
+        """
+        Create the MLN from the template and the lateral edges.
+        """
+        # load the template graph
+        gTpl = self._get_template(verbose=verbose)
 
         # get colormap for edgeweights
         edge_weights = []
-        for nodeA,nodeB,data in gMST.edges(data=True):
+        for nodeA,nodeB,data in mst_edges:
             edge_weights.append(data['weight'])
-        
-        # determine a colorfunction
-        cfunc = np.array(np.linspace(0,256,len(set(edge_weights))),dtype='int')
-        lfunc = np.linspace(0.5,8,len(set(edge_weights)))
-
-        # sort the weights
-        weights = sorted(set(edge_weights))
 
-        # get the scale for the weights (needed for the line-width)
-        scale = 20.0 / max(edge_weights)
-
-        # load data for nodes into new graph
+        # get the nodes, their coordinates and their further attributes from
+        # the template
+        nodes,x,y,node_data = [],[],[],[]
         for node,data in gTpl.nodes(data=True):
-            if data['label'] in taxa:
-                data['graphics']['fill'] = '#ff0000'
-                data['graphics']['type'] = 'rectangle'
-                data['graphics']['w'] = 80.0
-                data['graphics']['h'] = 20.0
-            else:
-                data['graphics']['type'] = 'ellipse'
-                data['graphics']['w'] = 30.0
-                data['graphics']['h'] = 30.0
-                data['graphics']['fill'] = '#ff0000'
-            
-            gOut.add_node(data['label'],**data)
-
-        # load edge data into new graph
+            nodes += [data['label']]
+            x += [data['graphics']['x']]
+            y += [data['graphics']['y']]
+            node_data += [dict([(k,v) for k,v in data.items() if k not in
+                ['id','label']])]
+        idx = dict([(n,i) for i,n in enumerate(nodes)])
+
+        # the vertical edges are taken from the template
+        edges = []
+        edge_data = []
+        verticals = set()
         for nodeA,nodeB,data in gTpl.edges(data=True):
-            data['graphics']['width'] = 10.0
-            data['graphics']['fill'] = '#000000'
-            data['label'] = 'vertical'
-            del data['graphics']['Line']
-
-            gOut.add_edge(
-                    gTpl.node[nodeA]['label'],
-                    gTpl.node[nodeB]['label'],
-                    **data
-                    )
-        
-        # assign new edge weights
-        for nodeA,nodeB,data in gMST.edges(data=True):
+            nodeA = gTpl.node[nodeA]['label']
+            nodeB = gTpl.node[nodeB]['label']
+            edges += [(idx[nodeA],idx[nodeB],0,False,[],'#000000',10.0)]
+            edge_data += [dict([(k,v) for k,v in data.items() if k not in
+                ['source','target','label']])]
+            verticals.add((nodeA,nodeB))
+            verticals.add((nodeB,nodeA))
+
+        # add the horizontal edges, all nodes need coordinates in the template
+        for nodeA,nodeB,data in mst_edges:
             w = data['weight']
 
-            # get the color for the weight
-            color = mpl.colors.rgb2hex(colormap(cfunc[weights.index(w)]))
-
-            data['graphics'] = {}
-            data['graphics']['fill'] = color
-            data['graphics']['width'] = w * scale
-            data['cogs'] = ','.join([str(i) for i in data['cogs']])
-            data['label'] = 'horizontal'
-
-            # check for threshold
-            if w >= threshold:
-                try:
-                    gOut.edge[nodeA][nodeB]
-                except:
-                    # add the data to the out-graph
-                    gOut.add_edge(
-                        nodeA,
-                        nodeB,
-                        **data
-                        )
+            for node in [nodeA,nodeB]:
+                if node not in idx:
+                    raise ValueError(
+                            "[!] The node {0} is missing in the template "
+                            "{1}.gml.".format(node,self.dataset)
+                            )
+
+            # check for threshold, lateral edges which coincide with vertical
+            # edges are not added
+            if w >= threshold and (nodeA,nodeB) not in verticals:
+                edges += [(
+                    idx[nodeA],
+                    idx[nodeB],
+                    w,
+                    True,
+                    data['cogs'],
+                    '',
+                    0.0
+                    )]
+                edge_data += [{}]
+
+        sources,targets,ews,horizontal,cogs,fill,width = [list(x) for x in
+                zip(*edges)]
+
+        # get the colors and the widths of the lateral edges
+        lateral = [i for i in range(len(edges)) if horizontal[i]]
+        colors,widths = self._get_edge_styles(
+                edge_weights,
+                [ews[i] for i in lateral],
+                colormap
+                )
+        for i,color,w in zip(lateral,colors,widths):
+            fill[i] = color
+            width[i] = w
+
+        gOut = MLN(
+                nodes,
+                x,
+                y,
+                self.taxa,
+                sources,
+                targets,
+                ews,
+                horizontal,
+                cogs,
+                fill,
+                width,
+                node_data,
+                edge_data
+                )
+
+        return gOut
+
+    def get_MLN(
+            self,
+            glm,
+            threshold = 1,
+            verbose = False,
+            colormap = mpl.cm.jet,
+            single_file = False
+            ):
+        """
+        Compute an evolutionary network for a given model.
+
+        Parameters
+        ----------
+        glm : str
+            The name of the model.
+        threshold : int (default=1)
+            The minimal weight of the lateral edges in the network.
+        single_file : bool (default=False)
+            If set to True, the links of all taxa are written to one file,
+            along with an index file that stores the offset and the length in
+            bytes of the lines of each taxon. Otherwise, one file is written
+            for each taxon.
+        """
+
+        # make alias for tree and taxa for convenience
+        taxa = self.taxa
+        tree = self.tree
+
+        # verbose output
+        if verbose: print("[i] Inferring lateral edges...")
+
+        # get the lateral edges and the inferred lateral events
+        mst_edges,ile = self._get_lateral_edges(glm)
+
+        # verbose output
+        if verbose: print("[i] Creating the network...")
+
+        # create out graph
+        gOut = self._get_MLN_graph(
+                mst_edges,
+                threshold = threshold,
+                colormap = colormap,
+                verbose = verbose
+                )
 
         # verbose output
         if verbose: print("[i] Writing graph to file...")
 
+        # index the lateral edges for queries
+        gOut.make_index()
+
         # write the graph to file
-        f = open(self.dataset+'_trebor/mln-'+glm+'.gml','w')
-        for line in nx.generate_gml(gOut):
-            f.write(line+'\n')
-        f.close()
+        gOut.write_gml(self.dataset+'_trebor/mln-'+glm+'.gml')
+        gOut.save(self.dataset+'_trebor/mln-'+glm+'.npz')
 
         # write the inferred borrowing events (ILS, inferred lateral event) 
         # between all taxa to file
@@ -1588,6 +2401,8 @@ class TreBor(object):
 
         # add gOut to graphattributes
         self.graph[glm] = gOut
+        self.stats[glm]['threshold'] = threshold
+        self.stats[glm]['colormap'] = colormap
 
         # write stats to file
         f = open(self.dataset+'_trebor/taxa-'+glm+'.stats','w')
@@ -1595,13 +2410,9 @@ class TreBor(object):
         # get the degree
         nodes = tree.getNodeNames()
 
-        dgr,wdgr = [],[]
-        for taxon in nodes:
-            
-            horizontals = [g for g in gOut[taxon] if 'weight' in gOut[taxon][g]]
-            
-            dgr.append(len(horizontals))
-            wdgr.append(sum([gOut[taxon][g]['weight'] for g in horizontals]))
+        degree,wdegree = gOut.get_degree()
+        dgr = [int(degree[gOut.index[taxon]]) for taxon in nodes]
+        wdgr = [int(wdegree[gOut.index[taxon]]) for taxon in nodes]
 
         sorted_nodes = sorted(
                 zip(nodes,dgr,wdgr),
@@ -1623,20 +2434,21 @@ class TreBor(object):
 
         # write edge distributions
         f = open(self.dataset+'_trebor/edge-'+glm+'.stats','w')
-        edges = []
-        edges = [g for g in gOut.edges(data=True) if 'weight' in g[2]]
+        edges = np.where(gOut.horizontal)[0]
 
-        for nA,nB,d in sorted(
+        for i in sorted(
                 edges,
-                key=lambda x: x[2]['weight'],
+                key=lambda x: gOut.weights[x],
                 reverse = True
                 ):
+            nA = gOut.nodes[gOut.sources[i]]
+            nB = gOut.nodes[gOut.targets[i]]
             f.write(
                     '{0}\t{1}\t{2}\t{3}\t{4}\t{5}\n'.format(
                         nA,
                         nB,
-                        d['weight'],
-                        d['cogs'],
+                        gOut.weights[i],
+                        ','.join(gOut.get_cogs(i)),
                         tree.getNodeMatchingName(nA),
                         tree.getNodeMatchingName(nB)
                         )
@@ -1645,37 +2457,271 @@ class TreBor(object):
         if verbose: print("[i] Wrote edge-weight distributions to file.")
         
         # write specific links of taxa to file
-        try:
-            os.mkdir(self.dataset+'_trebor/taxa-'+glm)
-        except:
-            pass
-
+        # get the lines for the links of each taxon
+        links = {}
         for taxon in self.taxa:
-            f = open(self.dataset+'_trebor/taxa-'+glm+'/'+taxon+'.csv','w')
-            keys = [n for n in gOut[taxon] if gOut[taxon][n]['label'] == 'horizontal']
-            for key in sorted(keys,key=lambda x:gOut[taxon][x]['weight']):
-                for cog in gOut[taxon][key]['cogs'].split(','):
-                    tmp = [x for x in self.etd[cog] if x != 0]
-                    idx = [x[0] for x in tmp][0]
-                    concept = self.wl[idx,'concept']
-
-                    if 'proto' in self.wl.entries:
-                        proto = cog + '\t'+self.wl[idx,'proto']
-                    else:
-                        proto = cog
-                    if 'note' in self.wl.entries:
-                        proto += '\t'+self.wl[idx,'note']
-
-                    f.write('{0}\t{1}\t{2}\n'.format(
-                        key,
-                        proto,
-                        concept
-                        ))
+            links[taxon] = []
+            keys = gOut.get_links(taxon)
+            for key,edge in sorted(keys,key=lambda x:gOut.weights[x[1]]):
+                for cog in gOut.get_cogs(edge):
+                    idx,concept,proto,note = self._cog_meta[cog]
+
+                    line = key + '\t' + cog
+                    if proto is not None:
+                        line += '\t' + proto
+                    if note is not None:
+                        line += '\t' + note
+
+                    links[taxon] += [line + '\t' + concept + '\n']
+
+        if single_file:
+            # write all links to one file, the index stores the offset and the
+            # length in bytes of the block of each taxon
+            f = open(self.dataset+'_trebor/taxa-'+glm+'.links','wb')
+            g = open(self.dataset+'_trebor/taxa-'+glm+'.links.idx','w')
+            for taxon in self.taxa:
+                block = ''.join(
+                        [taxon + '\t' + line for line in links[taxon]]
+                        ).encode('utf-8')
+                g.write('{0}\t{1}\t{2}\n'.format(taxon,f.tell(),len(block)))
+                f.write(block)
             f.close()
-        if verbose: pirnt("[i] Wrote list of edges per taxa to file.")
+            g.close()
+        else:
+            try:
+                os.mkdir(self.dataset+'_trebor/taxa-'+glm)
+            except:
+                pass
+
+            for taxon in self.taxa:
+                f = open(self.dataset+'_trebor/taxa-'+glm+'/'+taxon+'.csv','w')
+                for line in links[taxon]:
+                    f.write(line)
+                f.close()
+        if verbose: print("[i] Wrote list of edges per taxa to file.")
 
         return 
 
+    def get_MLN_thresholds(
+            self,
+            glm,
+            thresholds,
+            output_gml = False,
+            verbose = False,
+            colormap = mpl.cm.jet
+            ):
+        """
+        Compute the network of a given model for a list of thresholds.
+
+        Parameters
+        ----------
+        glm : str
+            The name of the model.
+        thresholds : list
+            The thresholds for the minimal weight of the lateral edges.
+        output_gml : bool (default=False)
+            If set to True, the filtered network of each threshold is written
+            to file in GML-format.
+
+        Returns
+        -------
+        stats : dict
+            A dictionary with the thresholds as keys and a dictionary with
+            the number of lateral edges ("edges"), their summed weight
+            ("weight"), and the degree ("degree") and weighted degree
+            ("weighted_degree") of all nodes in the order of self.nodes as
+            values.
+
+        Notes
+        -----
+        The lateral edges are computed only once. They are sorted by
+        decreasing weight, so that the network for each threshold is a prefix
+        of the edge array and the statistics can be accumulated from one
+        threshold to the next one.
+        """
+        # verbose output
+        if verbose: print("[i] Inferring lateral edges...")
+
+        # get the lateral edges
+        mst_edges,ile = self._get_lateral_edges(glm)
+
+        # lateral edges which coincide with vertical edges of the template are
+        # not part of the network
+        verticals = self._get_verticals(verbose=verbose)
+        idx = self._node2idx
+        edges = [
+                (idx[a],idx[b],d['weight']) for a,b,d in mst_edges
+                if (a,b) not in verticals
+                ]
+        if edges:
+            sources,targets,weights = [np.array(x,dtype='int') for x in
+                    zip(*edges)]
+        else:
+            sources,targets,weights = [np.zeros(0,dtype='int') for i in
+                    range(3)]
+
+        # sort the edges by decreasing weight
+        order = np.argsort(-weights,kind='mergesort')
+        sources = sources[order]
+        targets = targets[order]
+        weights = weights[order]
+
+        # get the number of edges passing each threshold
+        cuts = np.searchsorted(-weights,-np.asarray(thresholds),side='right')
+
+        # accumulate the statistics from the highest to the lowest threshold
+        degree = np.zeros(len(self.nodes),dtype='int')
+        wdegree = np.zeros(len(self.nodes),dtype='int')
+        stats = {}
+        last = 0
+        for cut,threshold in sorted(zip(cuts,thresholds),reverse=True,
+                key=lambda x:x[1]):
+            if cut > last:
+                for nodes in [sources[last:cut],targets[last:cut]]:
+                    np.add.at(degree,nodes,1)
+                    np.add.at(wdegree,nodes,weights[last:cut])
+                last = cut
+            stats[threshold] = dict(
+                    edges = int(cut),
+                    weight = int(weights[:cut].sum()),
+                    degree = degree.copy(),
+                    weighted_degree = wdegree.copy()
+                    )
+
+        # write the statistics to file
+        f = open(self.dataset+'_trebor/thresholds-'+glm+'.stats','w')
+        f.write('THRESHOLD\tEDGES\tWEIGHT\tLINKED\tMEAN_DEGREE\tMAX_DEGREE\n')
+        for threshold in sorted(stats):
+            dgr = stats[threshold]['degree']
+            linked = dgr[dgr > 0]
+            f.write('{0}\t{1}\t{2}\t{3}\t{4:.2f}\t{5}\n'.format(
+                threshold,
+                stats[threshold]['edges'],
+                stats[threshold]['weight'],
+                len(linked),
+                linked.mean() if len(linked) else 0.0,
+                dgr.max() if len(dgr) else 0
+                ))
+        f.close()
+
+        if verbose: print("[i] Wrote threshold statistics to file.")
+
+        # write the filtered networks to file
+        if output_gml:
+            for threshold in sorted(stats):
+                gOut = self._get_MLN_graph(
+                        mst_edges,
+                        threshold = threshold,
+                        colormap = colormap,
+                        verbose = verbose
+                        )
+                gOut.write_gml(
+                        self.dataset+'_trebor/mln-'+glm+'-'+str(threshold)+'.gml'
+                        )
+
+            if verbose: print("[i] Wrote filtered networks to file.")
+
+        return stats
+
+    def get_consensus_MLN(
+            self,
+            models = None,
+            verbose = False
+            ):
+        """
+        Compute the support of the lateral edges across several models.
+
+        Parameters
+        ----------
+        models : {None, list}
+            The models which shall be compared. If set to None, all models in
+            the gls-attribute are used.
+
+        Returns
+        -------
+        consensus : dict
+            A dictionary with the list of models ("models"), the list of
+            lateral edges as pairs of node names ("edges"), an array of
+            models and edges with the number of cogs supporting each edge in
+            each model ("counts"), and an array with the number of distinct
+            cogs supporting each edge in any of the models ("cogs"). The
+            result is also stored in the consensus-attribute.
+
+        Notes
+        -----
+        Only the lateral edges of the models are computed, no network is
+        created. The support is written to the file consensus.stats, with
+        the number of models and the number of distinct cogs supporting each
+        edge.
+        """
+        if not models:
+            models = sorted(self.gls)
+
+        # lateral edges which coincide with vertical edges of the template are
+        # not part of the network
+        verticals = self._get_verticals(verbose=verbose)
+        idx = self._node2idx
+
+        # collect the edges of all models, the nodes of an edge are ordered
+        # by the tree index
+        edges = {}
+        edge_cogs = []
+        rows,cols,counts = [],[],[]
+        for i,glm in enumerate(models):
+
+            if verbose: print("[i] Inferring lateral edges of model {0}...".format(glm))
+
+            mst_edges,ile = self._get_lateral_edges(glm)
+            for nodeA,nodeB,data in mst_edges:
+                if (nodeA,nodeB) in verticals:
+                    continue
+                if idx[nodeA] > idx[nodeB]:
+                    nodeA,nodeB = nodeB,nodeA
+                if (nodeA,nodeB) not in edges:
+                    edges[nodeA,nodeB] = len(edges)
+                    edge_cogs += [set()]
+                edge_cogs[edges[nodeA,nodeB]].update(data['cogs'])
+                rows += [i]
+                cols += [edges[nodeA,nodeB]]
+                counts += [data['weight']]
+
+        # create the matrix of models and edges
+        matrix = np.zeros((len(models),len(edges)),dtype='int')
+        matrix[rows,cols] = counts
+
+        # count the distinct cogs of the edges
+        cogs = np.array([len(c) for c in edge_cogs],dtype='int')
+
+        edges = sorted(edges,key=lambda x:edges[x])
+        self.consensus = dict(
+                models = models,
+                edges = edges,
+                counts = matrix,
+                cogs = cogs
+                )
+
+        # write the support of the edges to file
+        support = (matrix > 0).sum(0)
+        f = open(self.dataset+'_trebor/consensus.stats','w')
+        f.write('NODE_A\tNODE_B\tMODELS\tCOGS\t'+'\t'.join(models)+'\n')
+        for j in sorted(
+                range(len(edges)),
+                key=lambda x:(support[x],cogs[x]),
+                reverse = True
+                ):
+            f.write('{0}\t{1}\t{2}\t{3}\t{4}\n'.format(
+                edges[j][0],
+                edges[j][1],
+                support[j],
+                cogs[j],
+                '\t'.join([str(c) for c in matrix[:,j]])
+                ))
+        f.close()
+
+        if verbose: print("[i] Wrote consensus of {0} models to file.".format(len(models)))
+
+        return self.consensus
+
     def get_PDC(
             self,
             glm,
@@ -1734,71 +2780,498 @@ class TreBor(object):
         papIdx = self.wl.header['pap']
         taxIdx = self.wl._colIdx
 
-        # create a dictionary as updater for the wordlist
-        updater = {}
-        for key in self.wl:
+        # create a dictionary as updater for the wordlist
+        updater = {}
+        for key in self.wl:
+
+            # get the taxon first
+            taxon = self.wl[key][taxIdx]
+
+            # get the pap
+            pap = self.wl[key][papIdx]
+            
+            try:
+                updater[key] = '{0}:{1}'.format(pap,patchy[pap][taxon])
+            except KeyError:
+                updater[key] = '{0}:{1}'.format(pap,0)
+
+        # update the wordlist
+        self.wl.add_entries(
+                'patchy',
+                updater,
+                lambda x:x
+                )
+
+        # write data to file
+        self.wl.output('csv',filename=self.dataset+'_trebor/wl-'+glm)
+
+        if verbose: print("[i] Updated the wordlist.")
+
+        # write ranking of concepts to file
+        f = open(self.dataset + '_trebor/paps-'+glm+'.stats','w')
+        if 'proto' in self.wl.entries:
+            f.write('COGID\tGLID\tCONCEPT\tORIGINS\tPROTO\tREFLEXES\n')
+        else:
+            f.write('COGID\tGLID\tCONCEPT\tORIGINS\tREFLEXES\n')
+        concepts = {}
+        for a,b in sorted(paps,key=lambda x:x[1],reverse=True):
+            
+            a1,a2 = a.split(':')
+            a3 = self._id2gl[int(a2)]
+            
+            try:
+                concepts[a3] += [b]
+            except:
+                concepts[a3] = [b]
+            
+            # check for number of occurrences
+            l = [k for k in self.etd[a] if k != 0]
+
+            # check for proto
+            if 'proto' in self.wl.entries:
+                proto = self.wl[[k[0] for k in l][0],'proto']
+                f.write('{0}\t{1}\t{2}\t{3}\t{4}\t{5}\n'.format(a1,a2,a3,b,proto,len(l)))
+            else:
+                f.write('{0}\t{1}\t{2}\t{3}\n'.format(a1,a2,a3,b,len(l)))
+        f.close()
+        if verbose: print("[i] Wrote stats on paps to file.")
+
+        # write stats on concepts
+        f = open(self.dataset+'_trebor/concepts-'+glm+'.stats','w')
+        for key in concepts:
+            concepts[key] = sum(concepts[key])/len(concepts[key])
+
+        for a,b in sorted(concepts.items(),key=lambda x:x[1],reverse=True):
+            f.write('{0}\t{1:.2f}\n'.format(a,b))
+        f.close()
+        if verbose: print("[i] Wrote stats on concepts to file.")
+
+    def update(
+            self,
+            changes,
+            verbose = False
+            ):
+        """
+        Update the analysis after changes in the wordlist.
+
+        Parameters
+        ----------
+        changes : dict
+            A dictionary with the IDs of the changed rows of the wordlist as
+            keys and a dictionary of the changed entries and their new values
+            as values, such as {12 : {'cogid' : 5}}.
+
+        Notes
+        -----
+        Only the paps of those cognate sets which are touched by the changes
+        are calculated anew. Their gain-loss scenarios are then recomputed
+        for all models in the gls-attribute, and the ancestral distributions,
+        the statistics, the mixed model, and the networks are patched
+        accordingly. In the networks, only the lateral edges whose links
+        have changed are replaced, and the networks are not written to file
+        (use TreBor.get_MLN for the output). Changing the concept or the
+        taxon of a row is not supported.
+        """
+        # get the indices of the entries which are used in the following
+        papIdx = self.wl.header[self._pap_string]
+        cogIdx = self.wl.header['cogid']
+        glIdx = self.wl.header['glid']
+
+        # get the concepts touched by the changes and their cogs before the
+        # changes are carried out
+        concepts = {}
+        for idx in changes:
+            concept = self.wl[idx,'concept']
+            if concept not in concepts:
+                concepts[concept] = set(
+                        self.wl.get_list(
+                            row=concept,
+                            entry=self._pap_string,
+                            flat=True
+                            )
+                        )
+
+        # apply the changes to the wordlist
+        for idx,entries in changes.items():
+            for entry,value in entries.items():
+                if entry in ['concept','glid'] or \
+                        self.wl.header[entry] == self.wl._colIdx:
+                    raise ValueError(
+                            "[!] The entry {0} cannot be updated.".format(entry)
+                            )
+                self.wl[idx][self.wl.header[entry]] = value
+
+            # update the pap if the cognate id has changed
+            if 'cogid' in entries and self._pap_string not in entries:
+                self.wl[idx][papIdx] = "{0}:{1}".format(
+                        self.wl[idx][cogIdx],
+                        self.wl[idx][glIdx]
+                        )
+
+        if verbose: print("[i] Updated the wordlist.")
+
+        # recompute the paps of the touched cogs
+        touched = {}
+        singletons = set(self.singletons)
+        for concept,old_cogs in concepts.items():
+            
+            # get the rows of the concept for each taxon
+            tmp = self.wl.get_dict(row=concept)
+
+            # get the etymological dictionary for the cogs of the concept
+            etd = {}
+            for i,taxon in enumerate(self.taxa):
+                for idx in tmp.get(taxon,[]):
+                    cog = self.wl[idx][papIdx]
+                    if cog not in etd:
+                        etd[cog] = [0 for t in self.taxa]
+                    if etd[cog][i] == 0:
+                        etd[cog][i] = [idx]
+                    else:
+                        etd[cog][i] += [idx]
+
+            for cog in old_cogs.union(etd):
+                touched[cog] = concept
+                singletons.discard(cog)
+
+                # remove cogs which do no longer occur in the data
+                if cog not in etd:
+                    for attr in [self.paps,self.etd,self.concepts,self._cog_meta]:
+                        if cog in attr:
+                            del attr[cog]
+                    continue
+
+                self.etd[cog] = etd[cog]
+                self._get_cog_meta([cog])
+                self.paps[cog] = []
+                for i,taxon in enumerate(self.taxa):
+                    if etd[cog][i] != 0:
+                        self.paps[cog] += [1]
+                    elif taxon in tmp:
+                        self.paps[cog] += [0]
+                    else:
+                        self.paps[cog] += [-1]
+                self.concepts[cog] = concept
+
+                # check for singletons
+                if sum([1 for p in self.paps[cog] if p >= 1]) == 1:
+                    singletons.add(cog)
+
+        self.singletons = [k for k in self.concepts if k in singletons]
+        self.cogs = [k for k in self.concepts if k not in singletons]
+        
+        if verbose: print("[i] Recomputed {0} PAPs.".format(len(touched)))
+
+        # store the previous scenarios of the touched cogs
+        previous = {}
+        for glm in self.gls:
+            previous[glm] = dict(
+                    [(cog,self.gls[glm].get(cog)) for cog in touched]
+                    )
+
+        # recompute the scenarios for the touched cogs in all models
+        nodes = self._get_ancestral_nodes()
+        cogs = set(self.cogs)
+        for glm in [m for m in self.gls if m != 'mixed']:
+            for cog in touched:
+                
+                # remove the old scenario and its ancestral states
+                if cog in self.gls[glm]:
+                    if glm in self.dists:
+                        states = self._get_ancestral_states(
+                                self.gls[glm][cog][0],
+                                nodes
+                                )
+                        self.dists[glm] = [a-b for a,b in zip(
+                            self.dists[glm],
+                            states
+                            )]
+                    del self.gls[glm][cog]
+
+                # add the new scenario and its ancestral states
+                if cog in cogs:
+                    self.gls[glm][cog] = self._get_cog_GLS(
+                            cog,
+                            self.stats[glm]['mode'],
+                            self.stats[glm]['ratio'],
+                            self.stats[glm]['restriction']
+                            )
+                    if glm in self.dists:
+                        states = self._get_ancestral_states(
+                                self.gls[glm][cog][0],
+                                nodes
+                                )
+                        self.dists[glm] = [a+b for a,b in zip(
+                            self.dists[glm],
+                            states
+                            )]
+
+            if verbose: print("[i] Updated the scenarios of model {0}.".format(glm))
+
+        # choose the best models for the touched concepts in the mixed model
+        if 'mixed' in self.gls:
+            models = self.stats['mixed']['models']
+            for concept in concepts:
+                for cog in [k for k,c in touched.items() if c == concept]:
+                    if cog in self.gls['mixed']:
+                        states = self._get_ancestral_states(
+                                self.gls['mixed'][cog][0],
+                                nodes
+                                )
+                        self.dists['mixed'] = [a-b for a,b in zip(
+                            self.dists['mixed'],
+                            states
+                            )]
+                        del self.gls['mixed'][cog]
+                        del self.best_models[cog]
+
+                best_model,maxP,pap_set,avsd = self._get_best_model(
+                        concept,
+                        models,
+                        nodes
+                        )
+                for p in pap_set:
+                    gls,noo = self.gls[best_model][p]
+                    self.best_models[p] = (best_model,noo,maxP)
+                    self.gls['mixed'][p] = (gls,noo)
+                self.dists['mixed'] = [a+b for a,b in zip(
+                    self.dists['mixed'],
+                    avsd
+                    )]
+
+            if verbose: print("[i] Updated the mixed model.")
+
+        # update the index of gains and losses
+        for glm in list(self.events):
+            self._update_events(glm,previous[glm])
+
+        # update the statistics
+        if 'contemporary' in self.dists:
+            self.get_CVSD(verbose=verbose)
+        for glm in self.gls:
+            noo = self.gls[glm].get_noo()
+            self.stats[glm]['ano'] = noo.sum() / len(noo)
+            self.stats[glm]['mno'] = noo.max()
+            if glm in self.dists and 'contemporary' in self.dists:
+                self.stats[glm]['vsd'] = sps.mannwhitneyu(
+                        self.dists['contemporary'],
+                        self.dists[glm]
+                        )
+            self._write_GLS(glm,verbose=verbose)
+
+        # update the co-origin counts and the networks
+        changed = {}
+        for glm in list(self.coorigins):
+            changed[glm] = self._update_lateral(glm,previous[glm])
+        for glm in list(self.graph):
+            if changed.get(glm) is not None:
+                self._update_MLN(glm,changed[glm])
+            else:
+                mst_edges,ile = self._get_lateral_edges(glm)
+                self.graph[glm] = self._get_MLN_graph(
+                        mst_edges,
+                        threshold = self.stats[glm]['threshold'],
+                        colormap = self.stats[glm]['colormap']
+                        )
+                self.graph[glm].make_index()
+
+            if verbose: print("[i] Updated the network of model {0}.".format(glm))
+
+        return
+
+    def _get_VSD(
+            self,
+            glm,
+            verbose = False
+            ):
+        """
+        Compare the ancestral with the contemporary distribution of a model.
+        """
+        if 'contemporary' not in self.dists:
+            self.get_CVSD(verbose=verbose)
+        if glm not in self.dists:
+            self.get_AVSD(glm,verbose=verbose)
+
+        if 'vsd' not in self.stats[glm]:
+            self.stats[glm]['vsd'] = sps.mannwhitneyu(
+                    self.dists['contemporary'],
+                    self.dists[glm]
+                    )
+
+        return self.stats[glm]['vsd']
+
+    def _evaluate_ratio(
+            self,
+            ratio,
+            points,
+            verbose = False,
+            **keywords
+            ):
+        """
+        Evaluate a weighted model with a given ratio of gains and losses.
+        """
+        if ratio not in points:
+            params = (ratio.numerator,ratio.denominator)
+            glm = self._get_glm('weighted',params)
+
+            if glm not in self.gls:
+                if verbose: print(
+                        "[i] Analysing dataset with mode weighted "+\
+                                "and ratio {0[0]}:{0[1]}...".format(params)
+                                )
+                self.get_GLS(
+                        mode = 'weighted',
+                        ratio = params,
+                        verbose = verbose,
+                        **keywords
+                        )
+
+            points[ratio] = self._get_VSD(glm,verbose=verbose)[1]
 
-            # get the taxon first
-            taxon = self.wl[key][taxIdx]
+        return points[ratio]
 
-            # get the pap
-            pap = self.wl[key][papIdx]
-            
-            try:
-                updater[key] = '{0}:{1}'.format(pap,patchy[pap][taxon])
-            except KeyError:
-                updater[key] = '{0}:{1}'.format(pap,0)
+    def search(
+            self,
+            ratios = (1,2,3),
+            tolerance = 0.1,
+            limit = 20,
+            verbose = False,
+            **keywords
+            ):
+        """
+        Search for the ratio of gains and losses which fits the data best.
 
-        # update the wordlist
-        self.wl.add_entries(
-                'patchy',
-                updater,
-                lambda x:x
+        Parameters
+        ----------
+        ratios : tuple (default=(1,2,3))
+            The coarse set of ratios of gain and loss weights which are
+            evaluated first, all ratios have to be positive.
+        tolerance : float (default=0.1)
+            The search stops when the bracket around the best ratio is
+            smaller than this value. The ratios are approximated by fractions
+            with a denominator of at most 2 / tolerance.
+        limit : int (default=20)
+            The maximal number of models which are evaluated.
+
+        Returns
+        -------
+        runs : list
+            The weighted runs which have been evaluated during the search,
+            ordered by their ratio, in the format which is used by
+            TreBor.analyze.
+
+        Notes
+        -----
+        The ratio is treated as a continuous parameter. After evaluating the
+        coarse set of ratios, the bracket around the ratio with the highest
+        p-value of the VSD comparison is extended until the best ratio is
+        enclosed by two worse ones, and it is then narrowed down with a
+        golden-section search. Only the models visited by the search are
+        computed, and the evaluated models are written to a report file.
+        Keywords are passed to TreBor.get_GLS.
+        """
+        # check the ratios, gains and losses need positive weights
+        if [ratio for ratio in ratios if ratio <= 0]:
+            raise ValueError("[!] The ratios should be positive.")
+
+        # get the maximal denominator for the approximation of the ratios,
+        # small ratios are not rounded down to zero
+        denominator = int(2 / tolerance + 0.5)
+        convert = lambda x: max(
+                Fraction(x).limit_denominator(denominator),
+                Fraction(1,denominator)
                 )
 
-        # write data to file
-        self.wl.output('csv',filename=self.dataset+'_trebor/wl-'+glm)
+        # evaluate the coarse set of ratios
+        points = {}
+        for ratio in ratios:
+            self._evaluate_ratio(convert(ratio),points,verbose,**keywords)
+
+        # get the bracket around the best ratio
+        while len(points) < limit:
+            xs = sorted(points)
+            best = max(xs,key=lambda x:points[x])
+            i = xs.index(best)
+
+            # extend the bracket if the best ratio lies at its border
+            if len(xs) == 1:
+                new = convert(best * 2)
+            elif i == len(xs) - 1:
+                new = convert(best + (best - xs[i-1]))
+            elif i == 0:
+                new = convert(max(best - (xs[1] - best),best / 2))
+            else:
+                break
+
+            # stop if the bracket cannot be extended any further
+            if new in points:
+                break
+            self._evaluate_ratio(new,points,verbose,**keywords)
+
+        # narrow down the bracket with a golden-section search
+        golden = (3 - 5 ** 0.5) / 2
+        xs = sorted(points)
+        best = max(xs,key=lambda x:points[x])
+        if 0 < xs.index(best) < len(xs) - 1:
+            lower = xs[xs.index(best)-1]
+            upper = xs[xs.index(best)+1]
+            
+            while upper - lower > tolerance and len(points) < limit:
+                
+                # probe the larger of the two intervals
+                if upper - best > best - lower:
+                    new = convert(best + golden * (upper - best))
+                else:
+                    new = convert(best - golden * (best - lower))
 
-        if verbose: print("[i] Updated the wordlist.")
+                # stop if the probe cannot be resolved any further
+                if new in [lower,best,upper]:
+                    break
+                p = self._evaluate_ratio(new,points,verbose,**keywords)
 
-        # write ranking of concepts to file
-        f = open(self.dataset + '_trebor/paps-'+glm+'.stats','w')
-        if 'proto' in self.wl.entries:
-            f.write('COGID\tGLID\tCONCEPT\tORIGINS\tPROTO\tREFLEXES\n')
-        else:
-            f.write('COGID\tGLID\tCONCEPT\tORIGINS\tREFLEXES\n')
-        concepts = {}
-        for a,b in sorted(paps,key=lambda x:x[1],reverse=True):
-            
-            a1,a2 = a.split(':')
-            a3 = self._id2gl[int(a2)]
-            
-            try:
-                concepts[a3] += [b]
-            except:
-                concepts[a3] = [b]
-            
-            # check for number of occurrences
-            l = [k for k in self.etd[a] if k != 0]
+                # shrink the bracket
+                if p > points[best]:
+                    if new > best:
+                        lower,best = best,new
+                    else:
+                        upper,best = best,new
+                else:
+                    if new > best:
+                        upper = new
+                    else:
+                        lower = new
 
-            # check for proto
-            if 'proto' in self.wl.entries:
-                proto = self.wl[[k[0] for k in l][0],'proto']
-                f.write('{0}\t{1}\t{2}\t{3}\t{4}\t{5}\n'.format(a1,a2,a3,b,proto,len(l)))
-            else:
-                f.write('{0}\t{1}\t{2}\t{3}\n'.format(a1,a2,a3,b,len(l)))
-        f.close()
-        if verbose: print("[i] Wrote stats on paps to file.")
+        # get the best model
+        glm = self._get_glm('weighted',(best.numerator,best.denominator))
+        if verbose: print("[i] Best model is {0}.".format(glm))
 
-        # write stats on concepts
-        f = open(self.dataset+'_trebor/concepts-'+glm+'.stats','w')
-        for key in concepts:
-            concepts[key] = sum(concepts[key])/len(concepts[key])
+        # write the evaluated points to file
+        folder = self.dataset+'_trebor'
+        try:
+            os.mkdir(folder)
+        except:
+            pass
 
-        for a,b in sorted(concepts.items(),key=lambda x:x[1],reverse=True):
-            f.write('{0}\t{1:.2f}\n'.format(a,b))
+        f = open(folder+'/search.stats','w')
+        f.write("Ratio\tMode\tANO\tMNO\tVSD_z\tVSD_p\n")
+        runs = []
+        for ratio in sorted(points):
+            params = (ratio.numerator,ratio.denominator)
+            m = self._get_glm('weighted',params)
+            f.write(
+                    '{0:.4f}\t{1}\t{2:.2f}\t{3}\t{4}\n'.format(
+                        float(ratio),
+                        m,
+                        self.stats[m]['ano'],
+                        self.stats[m]['mno'],
+                        '{0[0]}\t{0[1]:.4f}'.format(self.stats[m]['vsd'])
+                        )
+                    )
+            runs += [('weighted',params)]
+        f.write("Best Model: {0}\n".format(glm))
         f.close()
-        if verbose: print("[i] Wrote stats on concepts to file.")
+
+        return runs
 
     def analyze(
             self,
@@ -1811,6 +3284,7 @@ class TreBor(object):
             full_analysis = True,
             plot_dists = True,
             output_plot=False,
+            incremental = True,
             **keywords
             ):
         """
@@ -1819,11 +3293,21 @@ class TreBor(object):
         Parameters
         ----------
         runs : {str list} (default="default")
-            Define a couple of different models to be analyzed.
+            Define a couple of different models to be analyzed. If set to
+            "search", the ratio of gains and losses is determined with help of
+            an adaptive search (see TreBor.search), and all models visited by
+            the search are analyzed.
         verbose : bool (default = False)
             If set to c{True}, be verbose when carrying out the analysis.
         usetex : bool (default=True)
             Specify whether you want to use LaTeX to render plots.
+        incremental : bool (default=True)
+            If set to c{True}, models which have already been analyzed are
+            not computed anew, so that an extended list of runs only triggers
+            the computation of the new models, while the summary table and
+            the plots are refreshed. Models which are not listed in the runs
+            are dropped from the summary. Set to c{False} in order to
+            recompute all models.
 
         """
         
@@ -1840,6 +3324,19 @@ class TreBor(object):
             if key not in keywords:
                 keywords[key] = defaults[key]
 
+        # search for the best ratio of gains and losses
+        if runs == 'search':
+            runs = self.search(
+                    verbose = verbose,
+                    output_gml = output_gml,
+                    tar = tar,
+                    output_plot = output_plot,
+                    **dict(
+                        [(k,v) for k,v in keywords.items() if k in 
+                            ['ratios','tolerance','limit']]
+                        )
+                    )
+
         # define a default set of runs
         if runs == 'default':
             runs = [
@@ -1861,7 +3358,20 @@ class TreBor(object):
                     ]
         
         # carry out the various analyses
+        modes = []
         for mode,params in runs:
+
+            # get the name of the model
+            glm = self._get_glm(mode,params)
+            if glm in modes:
+                continue
+            modes += [glm]
+
+            # skip the model if it has been computed before
+            if incremental and glm in self.gls:
+                if verbose: print("[i] Model {0} has already been analyzed.".format(glm))
+                continue
+
             if mode == 'weighted':
                 print(
                         "[i] Analysing dataset with mode {0} ".format(mode)+\
@@ -1906,25 +3416,29 @@ class TreBor(object):
     
         # calculate the different distributions
         # start by calculating the contemporary distributions
-        if verbose: print("[i] Calculating the Contemporary Vocabulary Distributions...")
-        self.get_CVSD(verbose=verbose)
+        if not incremental or 'contemporary' not in self.dists:
+            if verbose: print("[i] Calculating the Contemporary Vocabulary Distributions...")
+            self.get_CVSD(verbose=verbose)
         
     
         # now calculate the rest of the distributions
         if verbose: print("[i] Calculating the Ancestral Vocabulary Distributions...")
-        modes = list(self.gls.keys())
         for m in modes:
-            self.get_AVSD(m,verbose=verbose)
+            if m not in self.dists:
+                self.get_AVSD(m,verbose=verbose)
 
-        # calculate mixed model
+        # calculate mixed model, if the models it was derived from have changed
         if mixed:
-            if verbose: print("[i] Calculating the mixed model...")
-            self.get_IVSD(
-                    verbose=verbose,
-                    output_plot=output_plot,
-                    output_gml=output_gml,
-                    tar=tar
-                    )
+            if not incremental or 'mixed' not in self.gls or \
+                    self.stats['mixed']['models'] != sorted(modes):
+                if verbose: print("[i] Calculating the mixed model...")
+                self.get_IVSD(
+                        models=modes,
+                        verbose=verbose,
+                        output_plot=output_plot,
+                        output_gml=output_gml,
+                        tar=tar
+                        )
             modes += ['mixed']
 
         # compare the distributions using mannwhitneyu
@@ -1932,12 +3446,7 @@ class TreBor(object):
         
         zp_vsd = []
         for m in modes:
-            vsd = sps.mannwhitneyu(
-                    self.dists['contemporary'],
-                    self.dists[m]
-                    )
-
-            zp_vsd.append(vsd)
+            zp_vsd.append(self._get_VSD(m,verbose=verbose))
 
         # write results to file
         if verbose: print("[i] Writing stats to file.")
@@ -2009,35 +3518,34 @@ class TreBor(object):
                         p_vsd.append('p={0:.2f}'.format(p))
             
             # create the figure
-            fig = plt.figure()
-
-            # create the axis
-            ax = fig.add_subplot(111)
-
-            # add the boxplots
-            b = ax.boxplot([dist_vsd]+dists_vsd)
-            plt.setp(b['medians'],color='black')
-            plt.setp(b['whiskers'],color='black')
-            plt.setp(b['boxes'],color='black')
-
-            # adjust the yticks
-            for tick in ax.yaxis.get_major_ticks():
-                tick.label.set_fontsize(18)
-
-            # add the xticks
-            plt.xticks(
-                    range(1,len(modes)+2),
-                    ['']+['{0}\n{1}'.format(
-                        m,
-                        p
-                        ) for m,p in zip(mode_strings,p_vsd)
-                        ],
-                    size=18
-                    )
+            with self._get_figures().figure('vsd') as fig:
+
+                # create the axis
+                ax = fig.add_subplot(111)
+
+                # add the boxplots
+                b = ax.boxplot([dist_vsd]+dists_vsd)
+                plt.setp(b['medians'],color='black')
+                plt.setp(b['whiskers'],color='black')
+                plt.setp(b['boxes'],color='black')
+
+                # adjust the yticks
+                for tick in ax.yaxis.get_major_ticks():
+                    tick.label.set_fontsize(18)
+
+                # add the xticks
+                ax.set_xticks(range(1,len(modes)+2))
+                ax.set_xticklabels(
+                        ['']+['{0}\n{1}'.format(
+                            m,
+                            p
+                            ) for m,p in zip(mode_strings,p_vsd)
+                            ],
+                        size=18
+                        )
 
-            # save the figure
-            plt.savefig(self.dataset+'_trebor/vsd.pdf')
-            plt.clf()
+                # save the figure
+                fig.savefig(self.dataset+'_trebor/vsd.pdf')
             
             if verbose: print("[i] Plotted the distributions.")
         
@@ -2054,12 +3562,18 @@ class TreBor(object):
             else:
                 glm = 'mixed'
 
-            self.get_MLN(
-                glm,
-                verbose = verbose,
-                threshold = keywords['threshold'],
-                colormap = keywords['colormap']
-                )
+            # compute the network only if it is not available for the
+            # current threshold
+            update = not incremental or glm not in self.graph or \
+                    self.stats[glm].get('threshold') != keywords['threshold']
+
+            if update:
+                self.get_MLN(
+                    glm,
+                    verbose = verbose,
+                    threshold = keywords['threshold'],
+                    colormap = keywords['colormap']
+                    )
             self.plot_MLN(
                     glm,
                     verbose=verbose,
@@ -2080,10 +3594,32 @@ class TreBor(object):
                     colormap = keywords['colormap']
                     )
 
-            self.get_PDC(
-                    glm,
-                    verbose = verbose
-                    )
+            if update:
+                self.get_PDC(
+                        glm,
+                        verbose = verbose
+                        )
+
+        # write the statistics of the plots to file, the memory is the
+        # maximal increase of the peak memory of the process during one plot
+        if self.plot_stats:
+            f = open(self.dataset+'_trebor/plots.stats','w')
+            f.write("Plot\tCount\tTime\tMeanTime\tPeakIncrease\n")
+            for kind,stats in sorted(self.plot_stats.items()):
+                if stats['memory'] is None:
+                    memory = 'NA'
+                else:
+                    memory = '{0:.1f}'.format(stats['memory'])
+                f.write('{0}\t{1}\t{2:.2f}\t{3:.2f}\t{4}\n'.format(
+                    kind,
+                    stats['count'],
+                    stats['time'],
+                    stats['time'] / stats['count'],
+                    memory
+                    ))
+            f.close()
+
+            if verbose: print("[i] Wrote the statistics of the plots.")
 
     def plot_MLN(
             self,
@@ -2094,10 +3630,17 @@ class TreBor(object):
             fileformat = 'pdf',
             usetex = True,
             colormap = mpl.cm.jet,
-            taxon_labels = 'taxon.short_labels'
+            taxon_labels = 'taxon.short_labels',
+            rasterized = False
             ):
         """
         Plot the MLN with help of Matplotlib.
+
+        Parameters
+        ----------
+        rasterized : bool (default=False)
+            Rasterize the layer of the lateral edges in vector formats, which
+            reduces the size of the output for large networks.
         """
         # try to load the configuration file
         try:
@@ -2114,264 +3657,483 @@ class TreBor(object):
         # get the graph
         graph = self.graph[glm]
 
-        # store in internal and external nodes
-        inodes = []
-        enodes = []
-
-        # get the nodes
-        for n,d in graph.nodes(data=True):
-            g = d['graphics']
-            x = g['x']
-            y = g['y']
-            h = g['h']
-            w = g['w']
-
-            if d['label'] not in self.taxa:
-                inodes += [(x,y)]
-            else:
-                #if usetex:
-                #    enodes += [(x,y,r'\textbf{'+tfunc(d['label']).replace('_',r'\_')+r'}')]
-                #else:
-                enodes += [(x,y,tfunc(d['label']))]
+        # get the internal and external nodes
+        inodes = np.where(~graph.is_taxon)[0]
+        enodes = [(graph.x[i],graph.y[i],tfunc(graph.nodes[i])) for i in
+                np.where(graph.is_taxon)[0]]
         
-        # store vertical and lateral edges
-        vedges = []
-        ledges = []
-        weights = []
-
-        # get the edges
-        for a,b,d in graph.edges(data=True):
-            
-            xA = graph.node[a]['graphics']['x']
-            yA = graph.node[a]['graphics']['y']
-            xB = graph.node[b]['graphics']['x']
-            yB = graph.node[b]['graphics']['y']
-
-            if d['label'] == 'vertical':
-
-                vedges += [(xA,xB,yA,yB)]
-            else:
-                g = d['graphics']
-                f = g['fill']
-                w = g['width']
-                if d['weight'] < threshold:
-                    w = 0.0
-
-                ledges += [(xA,xB,yA,yB,f,w)]
-
-                weights.append(d['weight'])
+        # get the segments of all edges
+        segments = np.dstack([
+            np.column_stack([graph.x[graph.sources],graph.x[graph.targets]]),
+            np.column_stack([graph.y[graph.sources],graph.y[graph.targets]])
+            ])
+
+        # get the lateral edges above the threshold, sorted by their width
+        weights = list(graph.weights[graph.horizontal])
+        ledges = np.where(graph.horizontal & (graph.weights >= threshold))[0]
+        ledges = ledges[np.argsort(graph.width[ledges],kind='mergesort')]
+        vedges = np.where(~graph.horizontal)[0]
         
         # usetex
         mpl.rc('text',usetex = usetex)
 
         # create the figure
-        fig = plt.figure(facecolor='white')
-        figsp = fig.add_subplot(111)
+        with self._get_figures().figure('mln',facecolor='white') as fig:
+            figsp = fig.add_subplot(111)
         
-        # create the axis
-        ax = plt.axes(frameon=False)
-        plt.xticks([0],[''])
-        plt.yticks([0],[''])
+            # create the axis
+            ax = fig.add_subplot(111,frameon=False)
+            ax.set_xticks([0])
+            ax.set_xticklabels([''])
+            ax.set_yticks([0])
+            ax.set_yticklabels([''])
         
-        # set equal axis
-        plt.axis('equal')
-
-        # draw the horizontal edges
-        for xA,xB,yA,yB,f,w in sorted(ledges,key=lambda x:x[-1]):
-            plt.plot(
-                    [xA,xB],
-                    [yA,yB],
-                    '-',
-                    color=f,
-                    linewidth=float(w) / 3,
-                    alpha=0.75
+            # set equal axis
+            ax.axis('equal')
+
+            # draw the horizontal edges
+            ax.add_collection(
+                    LineCollection(
+                        segments[ledges],
+                        colors = [graph.fill[i] for i in ledges],
+                        linewidths = graph.width[ledges] / 3,
+                        alpha = 0.75,
+                        rasterized = rasterized
+                        )
                     )
 
-        # draw the vertical edges
-        for xA,xB,yA,yB in vedges:
-            plt.plot(
-                    [xA,xB],
-                    [yA,yB],
-                    '-',
-                    color='0.0',
-                    linewidth=5,
+            # draw the vertical edges
+            ax.add_collection(
+                    LineCollection(
+                        segments[vedges],
+                        colors = '0.0',
+                        linewidths = 5
+                        )
                     )
-            plt.plot(
-                    [xA,xB],
-                    [yA,yB],
-                    '-',
-                    color='1.0',
-                    linewidth=2,
+            ax.add_collection(
+                    LineCollection(
+                        segments[vedges],
+                        colors = '1.0',
+                        linewidths = 2
+                        )
                     )
+            ax.autoscale_view()
 
-        # draw the nodes
-        for x,y in inodes:
-            plt.plot(
-                    x,
-                    y,
+            # draw the nodes
+            ax.plot(
+                    graph.x[inodes],
+                    graph.y[inodes],
                     'o',
                     markersize=10,
                     color='black',
                     )
-            plt.plot(
-                    x,
-                    y,
+            ax.plot(
+                    graph.x[inodes],
+                    graph.y[inodes],
                     'o',
                     markersize=6,
                     color='white'
                     )
 
-        # draw the leaves
-        for x,y,t in enodes:
-            plt.text(
-                    x,
-                    y,
-                    t,
-                    size = '7',
-                    verticalalignment='center',
-                    backgroundcolor='black',
-                    horizontalalignment='center',
-                    fontweight = 'bold',
-                    color='white'
-                    )
+            # draw the leaves
+            for x,y,t in enodes:
+                ax.text(
+                        x,
+                        y,
+                        t,
+                        size = '7',
+                        verticalalignment='center',
+                        backgroundcolor='black',
+                        horizontalalignment='center',
+                        fontweight = 'bold',
+                        color='white'
+                        )
 
-        # add a colorbar
-        cax = figsp.imshow(
-                [[1,2],[1,2]],
-                cmap=colormap,
-                visible=False
-                )
-        cbar = fig.colorbar(
-                cax,
-                ticks = [
-                    1,
-                    1.25,
-                    1.5,
-                    1.75,
-                    2
-                    ],
-                orientation='vertical',
-                shrink=0.55
-                )
-        cbar.set_clim(1.0)
-        cbar.set_label('Inferred Links')
-        cbar.ax.set_yticklabels(
-                [
-                    str(min(weights)),
-                    '',
-                    str(int(max(weights) / 2)),
-                    '',
-                    str(max(weights))
-                    ]
-                )
+            # add a colorbar
+            cax = figsp.imshow(
+                    [[1,2],[1,2]],
+                    cmap=colormap,
+                    visible=False
+                    )
+            cbar = fig.colorbar(
+                    cax,
+                    ticks = [
+                        1,
+                        1.25,
+                        1.5,
+                        1.75,
+                        2
+                        ],
+                    orientation='vertical',
+                    shrink=0.55
+                    )
+            cbar.set_clim(1.0)
+            cbar.set_label('Inferred Links')
+            cbar.ax.set_yticklabels(
+                    [
+                        str(min(weights)),
+                        '',
+                        str(int(max(weights) / 2)),
+                        '',
+                        str(max(weights))
+                        ]
+                    )
 
-        plt.subplots_adjust(left=0.02,right=0.98,top=0.98,bottom=0.02)
+            fig.subplots_adjust(left=0.02,right=0.98,top=0.98,bottom=0.02)
 
-        # save the figure
-        plt.savefig(filename+'.'+fileformat)
-        plt.clf()
+            # save the figure
+            fig.savefig(filename+'.'+fileformat)
         if verbose: FileWriteMessage(filename,fileformat).message('written')
 
         return 
 
-    def plot_MSN(
+    def _get_coords_key(
+            self,
+            coords
+            ):
+        """
+        Return the coordinates of the taxa as key for the stored results.
+        """
+        return tuple([(taxon,tuple(coords[taxon])) for taxon in self.taxa if
+            taxon in coords])
+
+    def _get_hulls(
+            self,
+            coords
+            ):
+        """
+        Compute the convex hulls of the taxa of all internal nodes.
+
+        Parameters
+        ----------
+        coords : dict
+            The coordinates of the taxa.
+
+        Returns
+        -------
+        hulls : dict
+            A dictionary with the internal nodes as keys and a tuple of the
+            taxa on the hull and a KD-tree of their coordinates as values.
+
+        Notes
+        -----
+        The hulls are computed in one batch and stored in the
+        _hulls-attribute along with the coordinates, so that the nearest point
+        of a hull to a given taxon can be found in logarithmic time. They are
+        computed anew if the coordinates change. As for the hulls, the
+        coordinates are rounded to five decimal places, and a point on the
+        hull stands for the first taxon with these coordinates.
+        """
+        key = self._get_coords_key(coords)
+        if self._hulls[0] == key:
+            return self._hulls[1]
+
+        # get the coordinates of the taxa of all internal nodes
+        clades = []
+        for i,node in enumerate(self.nodes):
+            if self._sizes[i] == 1:
+                continue
+            taxa = self.tree.getNodeMatchingName(node).getTipNames()
+            if [t for t in taxa if t not in coords]:
+                continue
+            these_coords = [(round(coords[t][0],5),round(coords[t][1],5)) for t
+                    in taxa]
+            clades += [(node,taxa,these_coords)]
+
+        hulls = {}
+        for (node,taxa,these_coords),hull in zip(
+                clades,
+                convex_hulls([np.array(c).T for n,t,c in clades])
+                ):
+
+            # map the points on the hull to the taxa
+            first = {}
+            for taxon,point in zip(taxa,these_coords):
+                if point not in first:
+                    first[point] = taxon
+            hull_taxa = [first[tuple(point)] for point in hull.tolist()]
+
+            hulls[node] = (hull_taxa,cKDTree(hull))
+        self._hulls = (key,hulls)
+
+        return hulls
+
+    def _get_background(
+            self,
+            coords,
+            conf
+            ):
+        """
+        Return the projection and the rendered background of the map.
+
+        Parameters
+        ----------
+        coords : dict
+            The coordinates of the taxa.
+        conf : dict
+            The configuration of the plots.
+
+        Returns
+        -------
+        m : Basemap
+            The projection, without any map data.
+        image : np.array
+            The rendered background.
+        extent : tuple
+            The extent of the background in projected coordinates.
+
+        Notes
+        -----
+        The background only depends on the coordinates and the
+        configuration. It is rendered once, stored as a raster image with the
+        parameters of its projection in the folder of the results, and kept
+        in memory in the _backgrounds-attribute.
+        """
+        # determine the maxima of the coordinates
+        latitudes = [i[0] for i in coords.values()]
+        longitudes = [i[1] for i in coords.values()]
+
+        min_lat,max_lat = min(latitudes),max(latitudes)
+        min_lon,max_lon = min(longitudes),max(longitudes)
+
+        # get the parameters of the projection and the background
+        params = dict(
+            llcrnrlon=min_lon + conf['min_lon'],
+            llcrnrlat=min_lat + conf['min_lat'],
+            urcrnrlon=max_lon + conf['max_lon'],
+            urcrnrlat=max_lat + conf['max_lat'],
+            projection=conf['projection']
+            )
+        key = dict(
+                params,
+                resolution = conf['resolution'],
+                water_color = conf['water_color'],
+                continent_color = conf['continent_color'],
+                coastline_color = conf['coastline_color'],
+                dpi = conf.get('background.dpi',300)
+                )
+        key_string = json.dumps(key,sort_keys=True)
+
+        if key_string in self._backgrounds:
+            return self._backgrounds[key_string]
+
+        # instantiate the basemap without map data for the projection
+        m = bmp.Basemap(resolution=None,**params)
+        extent = (m.llcrnrx,m.urcrnrx,m.llcrnry,m.urcrnry)
+
+        # try to load the background from file
+        folder = self.dataset+'_trebor'
+        filename = folder+'/background-'+hashlib.md5(
+                key_string.encode('utf-8')
+                ).hexdigest()[:10]
+        try:
+            with open(filename+'.json') as f:
+                if json.load(f)['key'] != key:
+                    raise ValueError
+            image = plt.imread(filename+'.png')
+        except:
+            try:
+                os.mkdir(folder)
+            except:
+                pass
+
+            # draw the map on axes which fill the whole figure
+            width = 10.0
+            height = width * (extent[3]-extent[2]) / (extent[1]-extent[0])
+            with self._get_figures().figure(
+                    'background',
+                    figsize = (width,height)
+                    ) as fig:
+                ax = fig.add_axes([0,0,1,1])
+                bg = bmp.Basemap(resolution=conf['resolution'],ax=ax,**params)
+                bg.drawmapboundary(fill_color=conf['water_color'])
+                bg.drawcoastlines(color=conf['continent_color'],linewidth=0.5)
+                bg.drawcountries(color=conf['coastline_color'],linewidth=0.5)
+                bg.fillcontinents(color=conf['continent_color'],lake_color=conf['water_color'])
+                ax.set_xlim(extent[0],extent[1])
+                ax.set_ylim(extent[2],extent[3])
+                ax.axis('off')
+                fig.savefig(filename+'.png',dpi=key['dpi'])
+
+            with open(filename+'.json','w') as f:
+                json.dump(dict(key=key,extent=extent),f)
+            image = plt.imread(filename+'.png')
+
+        self._backgrounds[key_string] = (m,image,extent)
+
+        return self._backgrounds[key_string]
+
+    def _get_geo_distances(
+            self,
+            coords = None
+            ):
+        """
+        Return the great-circle distances between all taxa.
+
+        Parameters
+        ----------
+        coords : {None, dict}
+            The coordinates of the taxa, if not given, they are loaded from
+            file.
+
+        Returns
+        -------
+        taxa : list
+            The taxa with coordinates, in the order of the taxa attribute.
+        distances : np.array
+            The matrix of the distances in kilometers.
+
+        Notes
+        -----
+        The distances are computed with the haversine formula for all pairs
+        of taxa at once and then stored along with the coordinates, they are
+        computed anew if the coordinates change.
+        """
+        if coords is None:
+            coords = self._get_map_data()[0]
+
+        key = self._get_coords_key(coords)
+        if self._geo_distances[0] == key:
+            return self._geo_distances[1]
+
+        taxa = [taxon for taxon in self.taxa if taxon in coords]
+        distances = (
+                taxa,
+                haversine(
+                    [coords[taxon][0] for taxon in taxa],
+                    [coords[taxon][1] for taxon in taxa]
+                    )
+                )
+        self._geo_distances = (key,distances)
+
+        return distances
+
+    def get_spatial_correlation(
             self,
             glm,
-            verbose=False,
-            filename='pdf',
-            fileformat='pdf',
-            threshold = 1,
-            only = [],
-            usetex = True,
+            permutations = 999,
+            seed = None,
+            processes = 1,
             external_edges = False,
-            colormap = mpl.cm.jet
+            verbose = False
             ):
         """
-        Plot the Minimal Spatial Network.
+        Correlate the lateral links between the taxa with their distances.
 
         Parameters
         ----------
         glm : str
-            A string that encodes which model should be plotted.
-        filename : str
-            The name of the file to which the plot shall be written.
-        fileformat : str
-            The output format of the plot.
-        threshold : int (default=1)
-            The threshold for the minimal amount of shared links that shall be
-            plotted.
-        only : list (default=[])
-            The list of taxa whose connections with other taxa should be
-            plotted.
-        usetex : bool (default=True)
-            Specify whether LaTeX shall be used for the plot.
+            A string that encodes which model should be used.
+        permutations : int (default=999)
+            The number of permutations for the test of significance.
+        seed : {None, int}
+            The seed of the random number generator.
+        processes : {int, None} (default=1)
+            The number of worker processes which compute the permutations,
+            None uses all processors.
+        external_edges : bool (default=False)
+            If set to c{True}, links of internal nodes are ignored.
+
+        Returns
+        -------
+        r : float
+            The Mantel correlation of the weights of the links and the
+            geographic distances.
+        p : float
+            The p-value of the permutation test.
+
+        Notes
+        -----
+        The links between the taxa are taken from the Minimal Spatial
+        Network (see TreBor.plot_MSN), pairs of taxa without link have the
+        weight 0. If lateral links are geographically local, the correlation
+        is negative. The result is stored as "mantel" in the stats of the
+        model.
+        """
+        coords = self._get_map_data()[0]
+        taxa,distances = self._get_geo_distances(coords)
+        taxon2idx = dict([(t,i) for i,t in enumerate(taxa)])
+
+        # get the matrix of the weights of the links
+        weights = np.zeros((len(taxa),len(taxa)))
+        geoGraph = self._get_MSN(glm,coords,external_edges)
+        for a,b,d in geoGraph.edges(data=True):
+            if a in taxon2idx and b in taxon2idx and a != b:
+                weights[taxon2idx[a],taxon2idx[b]] += d['weight']
+                weights[taxon2idx[b],taxon2idx[a]] += d['weight']
+
+        r,p = mantel(
+                weights,
+                distances,
+                permutations = permutations,
+                seed = seed,
+                processes = processes
+                )
+        self.stats[glm]['mantel'] = (r,p)
 
+        if verbose: print("[i] Mantel correlation of links and distances: {0:.2f} (p={1:.4f}).".format(r,p))
+
+        return r,p
+
+    def _get_MSN(
+            self,
+            glm,
+            coords,
+            external_edges = False
+            ):
         """
-        # check for only
-        if not only:
-            only = self.taxa
+        Compute the lateral links between the taxa from the MLN.
 
-        # usetex
-        mpl.rc('text',usetex=True)
-    
+        Parameters
+        ----------
+        glm : str
+            A string that encodes which model should be used.
+        coords : dict
+            The coordinates of the taxa.
+        external_edges : bool (default=False)
+            If set to c{True}, links of internal nodes are ignored.
+
+        Returns
+        -------
+        geoGraph : networkx.Graph
+            The graph of the taxa with the summed weights of the links as
+            edge attribute.
+
+        Notes
+        -----
+        Links between a taxon and an internal node are assigned to the taxon
+        on the convex hull of the taxa of the internal node which is closest
+        to the taxon.
+        """
         # redefine taxa and tree for convenience
         taxa,tree = self.taxa,self.tree
 
         # get the graph
         graph = self.graph[glm]
 
-        # XXX check for coordinates of the taxa, otherwise load them from file and
-        # add them to the wordlist XXX add later, we first load it from file
-        if 'coords' in self.wl.entries:
-            pass
-        
-        else:
-            coords = csv2dict(
-                    self.dataset,
-                    'coords',
-                    dtype=[str,float,float]
-                    )
-
-        # check for groups, add functionality for groups in qlc-file later XXX
-        if 'group' in self.wl.entries:
-            pass
-        else:
-            groups = dict([(k,v) for k,v in csv2list(self.dataset,'groups')])
-        ## check for color, add functionality for colors later XXX
-        #if 'colors' in self.wl.entries:
-        #    pass
-        #else:
-        #    colors = dict([(k,v) for k,v in csv2list(self.dataset,'colors')])
+        # get the convex hulls of the taxa of all internal nodes
+        hulls = self._get_hulls(coords)
 
-        if verbose: LoadDataMessage('coordinates','groups','colors').message('loaded')
-        
-        # load the rc-file XXX add internal loading later
-        try:
-            conf = json.load(open(self.dataset+'.json'))
-        except:
-            pass # XXX add fallback later
-        
-        if verbose: LoadDataMessage('configuration')
-                
         # calculate all resulting edges, using convex hull as
         # approximation 
         geoGraph = nx.Graph()
         
-        for nA,nB,d in graph.edges(data=True):
+        for i in range(len(graph)):
             
             # get the labels
-            lA = graph.node[nA]['label']
-            lB = graph.node[nB]['label']
+            lA = graph.nodes[graph.sources[i]]
+            lB = graph.nodes[graph.targets[i]]
+            weight = int(graph.weights[i])
             
             # first check, whether edge is horizontal
-            if d['label'] == 'horizontal':
+            if graph.horizontal[i]:
                 
                 # if both labels occur in taxa, it is simple
                 if lA in taxa and lB in taxa:
                     try:
-                        geoGraph.edge[lA][lB]['weight'] += d['weight']
+                        geoGraph.edge[lA][lB]['weight'] += weight
                     except:
-                        geoGraph.add_edge(lA,lB,weight=d['weight'])
+                        geoGraph.add_edge(lA,lB,weight=weight)
                 elif not external_edges:
                     # if only one in taxa, we need the convex hull for that node
                     if lA in taxa or lB in taxa:
@@ -2379,37 +4141,22 @@ class TreBor(object):
                         # check which node is in taxa
                         if lA in taxa:
                             this_label = lA
-                            other_nodes = tree.getNodeMatchingName(lB).getTipNames()
                             other_label = lB
                         elif lB in taxa:
                             this_label = lB
-                            other_nodes = tree.getNodeMatchingName(lA).getTipNames()
                             other_label = lA
 
-                        # get the convex points of others
-                        these_coords = [(round(coords[t][0],5),round(coords[t][1],5)) for t in
-                                other_nodes]
-                        hulls = getConvexHull(these_coords,polygon=False)
-    
-                        # get the hull with the minimal euclidean distance
-                        distances = []
-                        for hull in hulls:
-                            distances.append(linalg.norm(np.array(hull) - np.array(coords[this_label])))
-                        this_hull = hulls[distances.index(min(distances))]
-                        other_label = other_nodes[
-                                these_coords.index(
-                                    (
-                                        round(this_hull[0],5),
-                                        round(this_hull[1],5)
-                                        )
-                                    )
-                                ]
+                        # get the taxon on the convex hull of the others
+                        # with the minimal euclidean distance
+                        hull_taxa,hull_tree = hulls[other_label]
+                        distance,idx = hull_tree.query(coords[this_label])
+                        other_label = hull_taxa[idx]
     
                         # append the edge to the graph
                         try:
-                            geoGraph.edge[this_label][other_label]['weight'] += d['weight']
+                            geoGraph.edge[this_label][other_label]['weight'] += weight
                         except:
-                            geoGraph.add_edge(this_label,other_label,weight=d['weight'])
+                            geoGraph.add_edge(this_label,other_label,weight=weight)
                         
                     #else:
                     #    # get the taxa of a and b
@@ -2440,6 +4187,58 @@ class TreBor(object):
                     #    except:
                     #        geoGraph.add_edge(labelA,labelB,weight=d['weight'])
 
+        return geoGraph
+
+    def plot_MSN(
+            self,
+            glm,
+            verbose=False,
+            filename='pdf',
+            fileformat='pdf',
+            threshold = 1,
+            only = [],
+            usetex = True,
+            external_edges = False,
+            colormap = mpl.cm.jet,
+            rasterized = False
+            ):
+        """
+        Plot the Minimal Spatial Network.
+
+        Parameters
+        ----------
+        glm : str
+            A string that encodes which model should be plotted.
+        filename : str
+            The name of the file to which the plot shall be written.
+        fileformat : str
+            The output format of the plot.
+        threshold : int (default=1)
+            The threshold for the minimal amount of shared links that shall be
+            plotted.
+        only : list (default=[])
+            The list of taxa whose connections with other taxa should be
+            plotted.
+        usetex : bool (default=True)
+            Specify whether LaTeX shall be used for the plot.
+        rasterized : bool (default=False)
+            Rasterize the layer of the edges in vector formats, which reduces
+            the size of the output for large networks.
+
+        """
+        # check for only
+        if not only:
+            only = self.taxa
+
+        # usetex
+        mpl.rc('text',usetex=True)
+    
+        # load coordinates, groups, and configuration
+        coords,groups,conf = self._get_map_data(verbose)
+                
+        # get the edges between the taxa
+        geoGraph = self._get_MSN(glm,coords,external_edges)
+
         # get the weights for the lines
         weights = []
         for a,b,d in geoGraph.edges(data=True):
@@ -2469,209 +4268,243 @@ class TreBor(object):
         linescale = conf['linescale'] / (max_weight-threshold) #XXX
         # XXX apparently not needed?
         
-        # determine the maxima of the coordinates
-        latitudes = [i[0] for i in coords.values()]
-        longitudes = [i[1] for i in coords.values()]
-
-        min_lat,max_lat = min(latitudes),max(latitudes)
-        min_lon,max_lon = min(longitudes),max(longitudes)
+        # get the projection and the map background
+        m,image,extent = self._get_background(coords,conf)
 
         # start to initialize the basemap
-        fig = plt.figure()
-        figsp = fig.add_subplot(111)
-        
-        # instantiate the basemap
-        m = bmp.Basemap(
-            llcrnrlon=min_lon + conf['min_lon'],
-            llcrnrlat=min_lat + conf['min_lat'],
-            urcrnrlon=max_lon + conf['max_lon'],
-            urcrnrlat=max_lat + conf['max_lat'],
-            resolution=conf['resolution'],
-            projection=conf['projection']
-            )
+        with self._get_figures().figure('msn') as fig:
+            figsp = fig.add_subplot(111)
         
-        # draw first values
-        m.drawmapboundary(fill_color=conf['water_color'])
-        m.drawcoastlines(color=conf['continent_color'],linewidth=0.5)
-        m.drawcountries(color=conf['coastline_color'],linewidth=0.5)
-        m.fillcontinents(color=conf['continent_color'],lake_color=conf['water_color'])
-
-        # plot the lines
-        for a,b,d in sorted(geoGraph.edges(data=True),key=lambda x:x[2]['weight']):
-            
-            # don't draw lines beyond threshold
-            if d['weight'] < threshold:
-                pass
-            else:
-                if a in coords and b in coords and a in only or b in only:
-                    w = d['weight']
+            # draw the background
+            figsp.imshow(image,extent=extent,zorder=0)
+            figsp.set_xlim(extent[0],extent[1])
+            figsp.set_ylim(extent[2],extent[3])
+            figsp.set_xticks([])
+            figsp.set_yticks([])
+
+            # get the edges above the threshold, sorted by their weight
+            edges = [(a,b,d['weight']) for a,b,d in sorted(
+                geoGraph.edges(data=True),
+                key=lambda x:x[2]['weight']
+                ) if d['weight'] >= threshold and (
+                    a in coords and b in coords and a in only or b in only
+                    )]
+
+            # project the coordinates of all edges at once
+            lats = np.array([[coords[a][0],coords[b][0]] for a,b,w in edges])
+            lons = np.array([[coords[a][1],coords[b][1]] for a,b,w in edges])
+            xs,ys = m(lons.reshape(-1),lats.reshape(-1))
+            segments = np.dstack([
+                np.reshape(xs,(-1,2)),
+                np.reshape(ys,(-1,2))
+                ])
+
+            # get colors and line widths of the edges
+            idx = np.searchsorted(sorted_weights,[w for a,b,w in edges])
+            colors = colormap(color_dict[idx])
+            colors[:,3] = conf['alpha']
+
+            # plot the lines
+            figsp.add_collection(
+                    LineCollection(
+                        segments,
+                        colors = colors,
+                        linewidths = line_dict[idx],
+                        zorder = 51,
+                        rasterized = rasterized
+                        )
+                    )
 
-                    # retrieve the coords
-                    yA,xA = coords[a]
-                    yB,xB = coords[b]
-                    
-                    # get the points on the map
-                    xA,yA = m(xA,yA)
-                    xB,yB = m(xB,yB)
-
-                    # plot the points
-                    plt.plot(
-                            [xA,xB],
-                            [yA,yB],
-                            '-',
-                            color=colormap(
-                                color_dict[sorted_weights.index(w)]
-                                ),
-                            alpha = conf['alpha'],
-                            linewidth=line_dict[sorted_weights.index(w)],
-                            zorder = w + 50
-                            )
+            # plot the points for the languages
+            cell_text = []
+            legend_check = []
 
-        # plot the points for the languages
-        cell_text = []
-        legend_check = []
+            # check for taxon.labels in conf
+            if 'taxon.labels' in conf:
+                tfunc = lambda x:conf['taxon.labels'][x]
+            else:
+                tfunc = lambda x:x
+            if 'groups.labels' in conf:
+                gfunc = lambda x:conf['groups.labels'][x]
+            else:
+                gfunc = lambda x:x
 
-        # check for taxon.labels in conf
-        if 'taxon.labels' in conf:
-            tfunc = lambda x:conf['taxon.labels'][x]
-        else:
-            tfunc = lambda x:x
-        if 'groups.labels' in conf:
-            gfunc = lambda x:conf['groups.labels'][x]
-        else:
-            gfunc = lambda x:x
+            # project the coordinates of all taxa at once
+            taxon_coords = sorted(coords.items(),key=lambda x:x[0])
+            xs,ys = m(
+                    np.array([lon for taxon,(lat,lon) in taxon_coords]),
+                    np.array([lat for taxon,(lat,lon) in taxon_coords])
+                    )
 
-        for i,(taxon,(lng,lat)) in enumerate(sorted(coords.items(),key=lambda x:x[0])):
+            for i,(taxon,(lng,lat)) in enumerate(taxon_coords):
             
-            # retrieve x and y from the map
-            x,y = m(lat,lng)
+                # retrieve x and y from the map
+                x,y = xs[i],ys[i]
             
-            # get the color of the given taxon
-            #taxon_color = colors[groups[taxon]]
+                # get the color of the given taxon
+                #taxon_color = colors[groups[taxon]]
             
-            # get colors from conf
-            this_group = groups[taxon]
-            taxon_color = conf['groups.colors'][this_group]
-            taxon_marker = conf['groups.markers'][this_group]
-
+                # get colors from conf
+                this_group = groups[taxon]
+                taxon_color = conf['groups.colors'][this_group]
+                taxon_marker = conf['groups.markers'][this_group]
+
+
+                # check for legend
+
+                if gfunc(groups[taxon]) in legend_check:
+                    # plot the marker
+                    figsp.plot(
+                        x,
+                        y,
+                        taxon_marker,
+                        markersize = conf['markersize'],
+                        color = taxon_color,
+                        zorder = max_weight+52,
+                        )
+                else:
+                    # plot the marker
+                    figsp.plot(
+                        x,
+                        y,
+                        taxon_marker,
+                        markersize = conf['markersize'],
+                        color = taxon_color,
+                        zorder = max_weight+52,
+                        label=gfunc(groups[taxon])
+                        )
+                    legend_check.append(gfunc(groups[taxon]))
+            
+                # add number to celltext
+                if usetex:
+                    cell_text.append([str(i+1),tfunc(taxon).replace('_',r'\_')])
+                else:
+                    cell_text.append([str(i+1),tfunc(taxon)])
 
-            # check for legend
+                # plot the text
+                # check for darkness of color
+                if taxon_color in ['black','gray'] or taxon_color[:3] in ['0.3','0.2','0.1','0.0']:
+                    text_color = 'white'
+                else:
+                    text_color = 'black'
 
-            if gfunc(groups[taxon]) in legend_check:
-                # plot the marker
-                plt.plot(
+                figsp.text(
                     x,
                     y,
-                    taxon_marker,
-                    markersize = conf['markersize'],
-                    color = taxon_color,
-                    zorder = max_weight+52,
+                    str(i+1),
+                    size = str(int(conf['markersize'] / 2)),
+                    color = text_color,
+                    label=taxon,
+                    horizontalalignment='center',
+                    fontweight="bold",
+                    verticalalignment='center',
+                    zorder=max_weight+55
                     )
-            else:
-                # plot the marker
-                plt.plot(
-                    x,
-                    y,
-                    taxon_marker,
-                    markersize = conf['markersize'],
-                    color = taxon_color,
-                    zorder = max_weight+52,
-                    label=gfunc(groups[taxon])
+
+            # add a colorbar
+            cax = figsp.imshow(
+                    [[1,2],[1,2]],
+                    visible=False,
+                    cmap=colormap
+                    )
+            cbar = fig.colorbar(
+                    cax,
+                    ticks = [
+                        1,
+                        1.25,
+                        1.5,
+                        1.75,
+                        2
+                        ],
+                    orientation='vertical',
+                    shrink=0.55
+                    )
+            cbar.set_clim(1.0)
+            cbar.set_label('Inferred Links')
+            cbar.ax.set_yticklabels(
+                    [
+                        str(min(weights)),
+                        '',
+                        str(int(max(weights) / 2)),
+                        '',
+                        str(max(weights))
+                        ]
                     )
-                legend_check.append(gfunc(groups[taxon]))
-            
-            # add number to celltext
-            if usetex:
-                cell_text.append([str(i+1),tfunc(taxon).replace('_',r'\_')])
-            else:
-                cell_text.append([str(i+1),tfunc(taxon)])
 
-            # plot the text
-            # check for darkness of color
-            if taxon_color in ['black','gray'] or taxon_color[:3] in ['0.3','0.2','0.1','0.0']:
-                text_color = 'white'
-            else:
-                text_color = 'black'
+            # add the legend
+            this_table = figsp.table(
+                    cellText = cell_text,
+                    colWidths = conf['table.column.width'],
+                    loc = conf['table.location'],
+                    )
+            this_table.auto_set_font_size(False)
+            this_table.set_fontsize(conf['table.text.size'])
+
+            # adjust the table
+            for line in this_table._cells:
+                this_table._cells[line]._text._horizontalalignment = 'left'
+                this_table._cells[line]._text._fontproperties.set_weight('bold')
+                this_table._cells[line]._text.set_color(conf['table.text.color'])
+                this_table._cells[line].set_height(conf['table.cell.height'])
+                #this_table._cells[line]._text._fontproperties.set_size(conf['table.text.size'])
+                this_table._cells[line].set_linewidth(0.0)
+                this_table._cells[line].set_color(conf['table.cell.color'])
+        
+            this_table.set_zorder(100)
+        
+            figsp.legend(
+                    loc=conf['legend.location'],
+                    numpoints=1,
+                    prop={
+                        'size':conf['legend.size'],
+                        'weight':'bold'
+                        }
+                    )
 
-            plt.text(
-                x,
-                y,
-                str(i+1),
-                size = str(int(conf['markersize'] / 2)),
-                color = text_color,
-                label=taxon,
-                horizontalalignment='center',
-                fontweight="bold",
-                verticalalignment='center',
-                zorder=max_weight+55
-                )
+            fig.subplots_adjust(left=0.02,right=0.98,top=1.0,bottom=0.00)
 
-        # add a colorbar
-        cax = figsp.imshow(
-                [[1,2],[1,2]],
-                visible=False,
-                cmap=colormap
-                )
-        cbar = fig.colorbar(
-                cax,
-                ticks = [
-                    1,
-                    1.25,
-                    1.5,
-                    1.75,
-                    2
-                    ],
-                orientation='vertical',
-                shrink=0.55
-                )
-        cbar.set_clim(1.0)
-        cbar.set_label('Inferred Links')
-        cbar.ax.set_yticklabels(
-                [
-                    str(min(weights)),
-                    '',
-                    str(int(max(weights) / 2)),
-                    '',
-                    str(max(weights))
-                    ]
-                )
+            fig.savefig(filename+'.'+fileformat)
+        if verbose: FileWriteMessage(filename,fileformat).message('written')
+        return
 
-        # add the legend
-        this_table = plt.table(
-                cellText = cell_text,
-                colWidths = conf['table.column.width'],
-                loc = conf['table.location'],
+    def _get_map_data(
+            self,
+            verbose = False
+            ):
+        """
+        Load coordinates, groups, and configuration for the geographic plots.
+
+        Returns
+        -------
+        coords : dict
+            The coordinates (latitude, longitude) of the taxa.
+        groups : dict
+            The groups of the taxa.
+        conf : dict
+            The configuration of the plots.
+        """
+        # XXX check for coordinates of the taxa, otherwise load them from file and
+        # add them to the wordlist XXX add later, we first load it from file
+        coords = csv2dict(
+                self.dataset,
+                'coords',
+                dtype=[str,float,float]
                 )
-        this_table.auto_set_font_size(False)
-        this_table.set_fontsize(conf['table.text.size'])
-
-        # adjust the table
-        for line in this_table._cells:
-            this_table._cells[line]._text._horizontalalignment = 'left'
-            this_table._cells[line]._text._fontproperties.set_weight('bold')
-            this_table._cells[line]._text.set_color(conf['table.text.color'])
-            this_table._cells[line].set_height(conf['table.cell.height'])
-            #this_table._cells[line]._text._fontproperties.set_size(conf['table.text.size'])
-            this_table._cells[line].set_linewidth(0.0)
-            this_table._cells[line].set_color(conf['table.cell.color'])
+
+        # check for groups, add functionality for groups in qlc-file later XXX
+        groups = dict([(k,v) for k,v in csv2list(self.dataset,'groups')])
+
+        if verbose: LoadDataMessage('coordinates','groups','colors').message('loaded')
         
-        this_table.set_zorder(100)
+        # load the rc-file XXX add internal loading later
+        try:
+            conf = json.load(open(self.dataset+'.json'))
+        except:
+            conf = {} # XXX add fallback later
         
-        plt.legend(
-                loc=conf['legend.location'],
-                numpoints=1,
-                prop={
-                    'size':conf['legend.size'],
-                    'weight':'bold'
-                    }
-                )
-
-        plt.subplots_adjust(left=0.02,right=0.98,top=1.0,bottom=0.00)
+        if verbose: LoadDataMessage('configuration')
 
-        plt.savefig(filename+'.'+fileformat)
-        plt.clf()
-        if verbose: FileWriteMessage(filename,fileformat).message('written')
-        return
+        return coords,groups,conf
 
     def plot_concepts(
             self,
@@ -2692,212 +4525,162 @@ class TreBor(object):
             usetex = True
             ):
         """
-        Plot the Minimal Spatial Network.
+        Plot the distribution of two cogs of a concept on a map.
 
         Parameters
         ----------
-        glm : str
-            A string that encodes which model should be plotted.
+        concept : str
+            The concept to which the cogs belong.
+        cogA, cogB : str
+            The cogs whose distribution shall be plotted.
         filename : str
             The name of the file to which the plot shall be written.
         fileformat : str
             The output format of the plot.
-        threshold : int (default=1)
-            The threshold for the minimal amount of shared links that shall be
-            plotted.
-        only : list (default=[])
-            The list of taxa whose connections with other taxa should be
-            plotted.
         usetex : bool (default=True)
             Specify whether LaTeX shall be used for the plot.
 
+        Notes
+        -----
+        Use plot_concept_maps to plot the maps of many pairs of cogs at once.
         """
-        # usetex
-        mpl.rc('text',usetex=True)
-    
-        # redefine taxa and tree for convenience
-        taxa,tree = self.taxa,self.tree
-
-        # XXX check for coordinates of the taxa, otherwise load them from file and
-        # add them to the wordlist XXX add later, we first load it from file
-        if 'coords' in self.wl.entries:
-            pass
-        
-        else:
-            coords = csv2dict(
-                    self.dataset,
-                    'coords',
-                    dtype=[str,float,float]
-                    )
-
-        # check for groups, add functionality for groups in qlc-file later XXX
-        if 'group' in self.wl.entries:
-            pass
-        else:
-            groups = dict([(k,v) for k,v in csv2list(self.dataset,'groups')])
-        # check for color, add functionality for colors later XXX
-        #if 'colors' in self.wl.entries:
-        #    pass
-        #else:
-        #    colors = dict([(k,v) for k,v in csv2list(self.dataset,'colors')])
-
-        if verbose: LoadDataMessage('coordinates','groups','colors').message('loaded')
-        
-        # load the rc-file XXX add internal loading later
-        try:
-            conf = json.load(open(self.dataset+'.json'))
-        except:
-            pass # XXX add fallback later
-        
-        if verbose: LoadDataMessage('configuration')
-                
-        # get the paps
-        these_taxa = {}
-        for taxon in taxa:
-
-            # get the dictionary and the entry
-            try:
-                cogs = self.wl.get_dict(col=taxon,entry='pap')[concept]
-            except:
-                cogs = []
-            
-            # check for identical cogs and assign them to the 4 categories
-            if cogA in cogs and cogB in cogs:
-                these_taxa[taxon] = 3
-            elif cogA in cogs and cogB not in cogs:
-                these_taxa[taxon] = 1
-            elif cogA not in cogs and cogB in cogs:
-                these_taxa[taxon] = 2
-            else:
-                these_taxa[taxon] = 4
-
-        # determine the maxima of the coordinates
-        latitudes = [i[0] for i in coords.values()]
-        longitudes = [i[1] for i in coords.values()]
+        self.plot_concept_maps(
+                [(concept,cogA,cogB)],
+                labels = labels,
+                tcolor = tcolor,
+                verbose = verbose,
+                filename = filename,
+                fileformat = fileformat,
+                usetex = usetex
+                )
 
-        min_lat,max_lat = min(latitudes),max(latitudes)
-        min_lon,max_lon = min(longitudes),max(longitudes)
+    def plot_concept_maps(
+            self,
+            triples,
+            labels = {1:'1',2:'2',3:'3',4:'4'},
+            tcolor = {
+                1:'white',
+                2:'black',
+                3:'0.5',
+                4:'0.1'
+                },
+            verbose = False,
+            filename = '{0}_{1}_{2}',
+            fileformat = 'pdf',
+            usetex = True,
+            processes = 1
+            ):
+        """
+        Plot the distribution of pairs of cogs of concepts on maps.
 
-        # start to initialize the basemap
-        fig = plt.figure()
-        figsp = fig.add_subplot(111)
-        
-        # instantiate the basemap
-        m = bmp.Basemap(
-            llcrnrlon=min_lon + conf['min_lon'],
-            llcrnrlat=min_lat + conf['min_lat'],
-            urcrnrlon=max_lon + conf['max_lon'],
-            urcrnrlat=max_lat + conf['max_lat'],
-            resolution=conf['resolution'],
-            projection=conf['projection']
-            )
-        
-        # draw first values
-        m.drawmapboundary(fill_color=conf['water_color'])
-        m.drawcoastlines(color=conf['continent_color'],linewidth=0.5)
-        m.drawcountries(color=conf['coastline_color'],linewidth=0.5)
-        m.fillcontinents(color=conf['continent_color'],lake_color=conf['water_color'])
-
-        # plot the points for the languages
-        cell_text = []
-        legend_check = []
-        for i,(taxon,(lng,lat)) in enumerate(sorted(coords.items(),key=lambda x:x[0])):
-            
-            # retrieve x and y from the map
-            x,y = m(lat,lng)
-            
-            # get the color of the given taxon
-            #taxon_color = colors[groups[taxon]]
-            
-            if these_taxa[taxon] == 4:
-                marker = '*'
-            else:
-                marker = 's'
+        Parameters
+        ----------
+        triples : list
+            A list of tuples of a concept and two of its cogs.
+        filename : str (default='{0}_{1}_{2}')
+            The name of the files to which the plots shall be written, the
+            concept and the cogs are inserted with str.format. If the name is
+            identical for all triples, the name is numbered.
+        fileformat : str
+            The output format of the plots.
+        usetex : bool (default=True)
+            Specify whether LaTeX shall be used for the plots.
+        processes : {int, None} (default=1)
+            The number of worker processes which render the maps, None uses
+            all processors.
+
+        Returns
+        -------
+        filenames : list
+            The names of the files which were written (without extension).
+
+        Notes
+        -----
+        Coordinates, groups, configuration, and map background are loaded
+        once for all maps, and the taxa which show the cogs are taken from
+        the PAP matrix. A taxon shows a cog, if the PAP is present and the
+        cog belongs to the concept. The maps are then rendered by the worker
+        processes, which all share the same background.
+        """
+        # usetex
+        mpl.rc('text',usetex=usetex)
 
-            # check for legend
-            if labels[these_taxa[taxon]] in legend_check:
-                # check for forth marker
-                # plot the marker
-                plt.plot(
-                    x,
-                    y,
-                    marker,
-                    markersize = conf['markersize'],
-                    color = tcolor[these_taxa[taxon]],
-                    #zorder = 50,
-                    )
-            else:
-                # plot the marker
-                plt.plot(
-                    x,
-                    y,
-                    marker,
-                    markersize = conf['markersize'],
-                    color = tcolor[these_taxa[taxon]],
-                    #zorder = 52,
-                    label=labels[these_taxa[taxon]]
-                    )
-                legend_check.append(labels[these_taxa[taxon]])
-            
-            # add number to celltext
-            if usetex:
-                cell_text.append([str(i+1),taxon.replace('_',r'\_')])
-            else:
-                cell_text.append([str(i+1),taxon])
+        coords,groups,conf = self._get_map_data(verbose)
 
-            # plot the text
-            if tcolor[these_taxa[taxon]] == 'black':
-                textcolor = 'white'
-            else:
-                textcolor='black'
-            
-            plt.text(
-                x,
-                y,
-                str(i+1),
-                size = str(int(conf['markersize'] / 2)),
-                label=taxon,
-                color = textcolor,
-                horizontalalignment='center',
-                verticalalignment='center',
-                )
+        # get the projection and the map background
+        m,image,extent = self._get_background(coords,conf)
 
-        this_table = plt.table(
-                cellText = cell_text,
-                colWidths = conf['table.column.width'],
-                loc = conf['table.location'],
+        # project the coordinates of all taxa at once
+        taxa = sorted(coords)
+        xs,ys = m(
+                np.array([coords[taxon][1] for taxon in taxa]),
+                np.array([coords[taxon][0] for taxon in taxa])
                 )
-
-        # adjust the table
-        for line in this_table._cells:
-            this_table._cells[line]._text._horizontalalignment = 'left'
-            this_table._cells[line]._text._fontproperties.set_weight('bold')
-            this_table._cells[line]._text.set_color(conf['table.text.color'])
-            this_table._cells[line].set_height(conf['table.cell.height'])
-            this_table._cells[line]._text._fontproperties.set_size(conf['table.text.size'])
-            this_table._cells[line].set_linewidth(0.0)
-            this_table._cells[line].set_color(conf['table.cell.color'])
         
-        this_table.set_zorder(100)
+        # get the membership of all taxa for all cogs from the paps
+        cogs = sorted(set([c for t in triples for c in t[1:]]))
+        cog2idx = dict([(c,i) for i,c in enumerate(cogs)])
+        taxon2idx = dict([(t,i) for i,t in enumerate(self.taxa)])
+        known = np.array([taxon in taxon2idx for taxon in taxa],dtype='bool')
+        idx = [taxon2idx[taxon] for taxon in taxa if taxon in taxon2idx]
+        members = np.zeros((len(cogs),len(taxa)),dtype='int')
+        for i,cog in enumerate(cogs):
+            if cog in self.paps:
+                members[i,known] = np.array(self.paps[cog])[idx] >= 1
         
-        plt.legend(
-                loc=conf['legend.location'],
-                numpoints=1,
-                prop={
-                    'size':conf['legend.size'],
-                    'weight':'bold'
-                    }
+        # assign the taxa to the 4 categories
+        codes = np.array([4,1,2,3])
+        tasks = []
+        for i,(concept,cogA,cogB) in enumerate(triples):
+            a = members[cog2idx[cogA]] * (self.concepts.get(cogA) == concept)
+            b = members[cog2idx[cogB]] * (self.concepts.get(cogB) == concept)
+            name = filename.format(concept,cogA,cogB)
+            if len(triples) > 1 and name == filename:
+                name = '{0}-{1}'.format(filename,i+1)
+            tasks += [(name,codes[a+2*b])]
+
+        shared = dict(
+                image = image,
+                extent = extent,
+                taxa = taxa,
+                x = xs,
+                y = ys,
+                conf = conf,
+                labels = labels,
+                tcolor = tcolor,
+                usetex = usetex,
+                fileformat = fileformat
                 )
-
-        plt.subplots_adjust(left=0.05,right=0.95,top=0.95,bottom=0.05)
-
-        plt.savefig(filename+'.'+fileformat)
-        plt.clf()
-        if verbose: FileWriteMessage(filename,fileformat).message('written')
-        return
+        
+        # render the maps
+        if processes == 1:
+            init_worker(shared)
+            results = [plot_concept_map(task) for task in tasks]
+        else:
+            pool = multiprocessing.Pool(
+                    processes,
+                    initializer = init_worker,
+                    initargs = (shared,)
+                    )
+            try:
+                results = pool.map(plot_concept_map,tasks)
+            finally:
+                pool.close()
+                pool.join()
+
+        # store the statistics of the plots
+        filenames = []
+        for name,stats in results:
+            self._get_figures().add('concept_map',stats)
+            filenames += [name]
+
+        if verbose:
+            for name in filenames:
+                FileWriteMessage(name,fileformat).message('written')
+
+        return filenames
             
 
-
 #!depr    def get_weighted_GLS_multi(
 #!depr            self,
 #!depr            pap,